@@ -0,0 +1,246 @@
+"""Load and latency benchmark for the LearnPython API.
+
+Runs each scenario at a fixed concurrency and reports throughput and
+p50/p95/p99 latency. By default requests go to the app in-process over ASGI
+(startup/shutdown included) against a throwaway SQLite database unless
+DATABASE_URL is set, and measuring starts once the result cache is
+prewarmed; pass --url to hit a running server instead (let it finish
+prewarming first).
+
+    python benchmark.py --concurrency 16 --requests 500 --output after.json
+    python benchmark.py --compare before.json --output after.json
+
+Results are written as JSON so runs can be compared with --compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+SCENARIOS = ("lessons", "lesson", "lessons_summary", "progress_read", "progress_write", "execute")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Scenario:
+    def __init__(self, name: str, make_request: Callable[[int], tuple]):
+        self.name = name
+        # Called with the request number; returns (method, url, kwargs)
+        self.make_request = make_request
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario,
+                       concurrency: int, total_requests: int) -> dict:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async def worker():
+        nonlocal errors
+        for number in counter:
+            method, url, kwargs = scenario.make_request(number)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = str(response.status_code)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                status = "error"
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "statuses": statuses,
+        "duration_s": round(elapsed, 4),
+        "requests_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+@asynccontextmanager
+async def open_client(url: Optional[str]):
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+            yield client
+        return
+
+    # Benchmark users and progress go to a throwaway database, not the
+    # developer's, unless DATABASE_URL says otherwise
+    if "DATABASE_URL" not in os.environ:
+        database = os.path.join(tempfile.mkdtemp(prefix="learnpython-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    from main import app, migrate
+    migrate()
+    async with app.router.lifespan_context(app):
+        # Prewarming runs examples in the background; let it finish so it
+        # doesn't compete with the scenarios for execution slots
+        await asyncio.wait([app.state.prewarm])
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            yield client
+
+
+async def authenticate(client: httpx.AsyncClient) -> dict:
+    username = f"bench-{int(time.time() * 1000)}"
+    user = (await client.post("/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": "benchmark",
+    })).json()
+    token = (await client.post("/login", params={"username": username, "password": "benchmark"})).json()
+    return {"user_id": user["id"], "headers": {"Authorization": f"Bearer {token['access_token']}"}}
+
+
+def build_scenarios(lessons: List[dict], auth: dict, bust_execute_cache: bool) -> Dict[str, Scenario]:
+    lesson_ids = [lesson["id"] for lesson in lessons]
+    examples = [lesson["code_example"] for lesson in lessons]
+    user_id, headers = auth["user_id"], auth["headers"]
+
+    def execute(number: int) -> tuple:
+        code = examples[number % len(examples)]
+        if bust_execute_cache:
+            code += f"\n# benchmark run {number}"
+        return "POST", "/execute", {"json": {"code": code}}
+
+    return {
+        "lessons": Scenario("lessons", lambda n: ("GET", "/lessons", {})),
+        "lesson": Scenario("lesson", lambda n: ("GET", f"/lessons/{lesson_ids[n % len(lesson_ids)]}", {})),
+        "lessons_summary": Scenario(
+            "lessons_summary", lambda n: ("GET", "/lessons", {"params": {"summary": True, "limit": 20}})),
+        "progress_read": Scenario(
+            "progress_read", lambda n: ("GET", f"/progress/{user_id}", {"headers": headers})),
+        "progress_write": Scenario("progress_write", lambda n: ("POST", "/progress", {
+            "headers": headers,
+            "json": {"user_id": user_id, "lesson_id": lesson_ids[n % len(lesson_ids)], "completed": True},
+        })),
+        "execute": Scenario("execute", execute),
+    }
+
+
+async def run_benchmark(url: Optional[str], scenarios: List[str], concurrency: int,
+                        total_requests: int, execute_requests: int, bust_execute_cache: bool) -> dict:
+    async with open_client(url) as client:
+        lessons = (await client.get("/lessons")).json()
+        auth = await authenticate(client)
+        available = build_scenarios(lessons, auth, bust_execute_cache)
+
+        results = {}
+        for name in scenarios:
+            count = execute_requests if name == "execute" else total_requests
+            # One warm-up pass so lazy initialisation doesn't skew the numbers
+            await run_scenario(client, available[name], concurrency, min(count, concurrency))
+            results[name] = await run_scenario(client, available[name], concurrency, count)
+            print(format_result(name, results[name]), file=sys.stderr)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "target": url or "in-process",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "concurrency": concurrency,
+            "requests": total_requests,
+            "execute_requests": execute_requests,
+            "bust_execute_cache": bust_execute_cache,
+        },
+        "scenarios": results,
+    }
+
+
+def format_result(name: str, result: dict) -> str:
+    latency = result["latency_ms"]
+    return (
+        f"{name:<16} {result['requests_per_s']:>9.1f} req/s  "
+        f"p50 {latency['p50']:>8.2f} ms  p95 {latency['p95']:>8.2f} ms  "
+        f"p99 {latency['p99']:>8.2f} ms  errors {result['errors']}"
+    )
+
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """Describe how each scenario moved relative to a previous run"""
+    lines = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        changes = []
+        for label, old, new in (
+            ("req/s", before["requests_per_s"], result["requests_per_s"]),
+            ("p50", before["latency_ms"]["p50"], result["latency_ms"]["p50"]),
+            ("p95", before["latency_ms"]["p95"], result["latency_ms"]["p95"]),
+            ("p99", before["latency_ms"]["p99"], result["latency_ms"]["p99"]),
+        ):
+            delta = (new - old) / old * 100 if old else 0.0
+            changes.append(f"{label} {old:g} -> {new:g} ({delta:+.1f}%)")
+        lines.append(f"{name:<16} " + ", ".join(changes))
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--execute-requests", type=int, default=50,
+                        help="requests for the execute scenario")
+    parser.add_argument("--bust-execute-cache", action="store_true",
+                        help="make every /execute snippet unique so the result cache is bypassed")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_benchmark(
+        args.url,
+        args.scenario or list(SCENARIOS),
+        args.concurrency,
+        args.requests,
+        args.execute_requests,
+        args.bust_execute_cache,
+    ))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            for line in compare(json.load(f), results):
+                print(line, file=sys.stderr)
+    return results
+
+
+if __name__ == "__main__":
+    main()
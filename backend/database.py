@@ -0,0 +1,406 @@
+"""SQLAlchemy storage for users, lessons and progress.
+
+DATABASE_URL picks the backend. Local/dev defaults to a SQLite file in WAL
+mode so several uvicorn workers on one box can share it; the schema only uses
+portable types and works unchanged on PostgreSQL.
+
+Lesson bodies live in the lesson files (see lesson_library); the lessons
+table only mirrors the catalog entries so progress rows can reference them.
+
+The schema is managed by the Alembic revisions in migrations/; run
+`alembic upgrade head` (or migrate()) once per deploy, before the API starts.
+
+Progress writes also keep counters in progress_stats up to date, in the same
+transaction, so statistics never need a scan of the progress table.
+"""
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text,
+    create_engine, delete, event, or_, select, text, tuple_,
+)
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./learnpython.db")
+
+Base = declarative_base()
+
+
+class UserRecord(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    username = Column(String(150), nullable=False, unique=True, index=True)
+    email = Column(String(255), nullable=False)
+    full_name = Column(String(255))
+
+
+class LessonRecord(Base):
+    """Catalog entry of a lesson; the bodies stay in the lesson files"""
+    __tablename__ = "lessons"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=False)
+    difficulty = Column(String(50), nullable=False, index=True)
+    category = Column(String(100), nullable=False, index=True)
+
+
+class ProgressRecord(Base):
+    __tablename__ = "progress"
+
+    # The composite primary key doubles as the per-user index
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), primary_key=True, autoincrement=False)
+    completed = Column(Boolean, nullable=False, default=False)
+    completed_at = Column(DateTime)
+
+    __table_args__ = (Index("ix_progress_lesson_id", "lesson_id"),)
+
+
+class ProgressStatRecord(Base):
+    """Progress counters for one group of records
+
+    scope is "all", "lesson", "user", "category", "difficulty" or "hour"
+    (key like 2026-01-31T09, UTC). started counts progress records and
+    completed those marked completed; hour buckets count completed records
+    by the hour of their completed_at.
+    """
+    __tablename__ = "progress_stats"
+
+    scope = Column(String(20), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    started = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+
+
+def create_db_engine(url: str = DATABASE_URL):
+    if url.startswith("sqlite"):
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False, "timeout": 30},
+            pool_size=int(os.getenv("DATABASE_POOL_SIZE", "5")),
+            pool_pre_ping=True,
+        )
+
+        @event.listens_for(engine, "connect")
+        def configure_sqlite(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # WAL lets readers in other workers proceed while one writes
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+
+        return engine
+
+    return create_engine(
+        url,
+        pool_size=int(os.getenv("DATABASE_POOL_SIZE", "5")),
+        pool_pre_ping=True,
+    )
+
+
+engine = create_db_engine()
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+
+
+# Where alembic.ini is; migrations live next to it, in migrations/
+MIGRATIONS_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def migrate(target_engine=None):
+    """Bring the database up to the latest schema revision
+
+    Same as `alembic upgrade head`. Run once per deploy, before the API
+    workers start; they never change the schema themselves.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(MIGRATIONS_CONFIG)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(MIGRATIONS_CONFIG), "migrations"))
+    with (target_engine or engine).begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+def _insert(table):
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def _upsert(session, record_class, rows: List[dict]):
+    """Insert rows, updating existing ones that share the primary key"""
+    if not rows:
+        return
+    table = record_class.__table__
+    keys = [column.name for column in table.primary_key.columns]
+    statement = _insert(table).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=keys,
+        set_={
+            column.name: statement.excluded[column.name]
+            for column in table.columns
+            if column.name not in keys
+        },
+    )
+    session.execute(statement)
+
+
+def _as_dict(record) -> dict:
+    return {column.name: getattr(record, column.name) for column in record.__table__.columns}
+
+
+class UserStore:
+    def get(self, username: str) -> Optional[dict]:
+        with SessionLocal() as session:
+            record = session.scalar(select(UserRecord).where(UserRecord.username == username))
+            return _as_dict(record) if record else None
+
+    def __contains__(self, username: str) -> bool:
+        return self.get(username) is not None
+
+    def create(self, username: str, email: str, full_name: Optional[str] = None) -> dict:
+        with SessionLocal.begin() as session:
+            record = UserRecord(username=username, email=email, full_name=full_name)
+            session.add(record)
+            session.flush()
+            return _as_dict(record)
+
+
+class LessonStore:
+    def upsert_many(self, lessons: Iterable[Mapping]):
+        columns = [column.name for column in LessonRecord.__table__.columns]
+        rows = [{column: lesson[column] for column in columns} for lesson in lessons]
+        with SessionLocal.begin() as session:
+            _upsert(session, LessonRecord, rows)
+
+    def all(self) -> List[dict]:
+        with SessionLocal() as session:
+            records = session.scalars(select(LessonRecord).order_by(LessonRecord.id))
+            return [_as_dict(record) for record in records]
+
+
+def hour_bucket(moment: Optional[datetime]) -> str:
+    moment = moment or datetime.now(timezone.utc)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H")
+
+
+def completion_hour(completed: bool, completed_at: Optional[datetime]) -> Optional[str]:
+    """Hour bucket a record counts towards; completions of unknown time count in none"""
+    if not completed or completed_at is None:
+        return None
+    return hour_bucket(completed_at)
+
+
+def _utc(moment: Optional[datetime]) -> Optional[datetime]:
+    # Stored naive, in UTC, so the hour read back is the hour counted
+    if moment is not None and moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _progress_row(record: Mapping, now: datetime, previous=None) -> dict:
+    """Column values for a progress record
+
+    A completion sent without completed_at keeps the time already stored
+    for it, or else is stamped now.
+    """
+    completed_at = _utc(record.get("completed_at"))
+    if record["completed"] and completed_at is None:
+        if previous is not None and previous.completed and previous.completed_at is not None:
+            completed_at = previous.completed_at
+        else:
+            completed_at = now
+    return {
+        "user_id": record["user_id"],
+        "lesson_id": record["lesson_id"],
+        "completed": bool(record["completed"]),
+        "completed_at": completed_at,
+    }
+
+
+StatKey = Tuple[str, str]
+
+
+def _tally(deltas: Dict[StatKey, List[int]], keys: Iterable[StatKey], started: int, completed: int):
+    for key in keys:
+        delta = deltas.setdefault(key, [0, 0])
+        delta[0] += started
+        delta[1] += completed
+
+
+class ProgressStore:
+    """Progress records, looked up through the per-user and per-lesson indexes"""
+
+    def upsert(self, progress: dict):
+        self.upsert_many([progress])
+
+    def upsert_many(self, records: List[dict]):
+        """Store records, moving the counters by how each one changed
+
+        Every statement covers the whole batch. New records are inserted
+        first, which also claims them against concurrent writers; existing
+        ones are then read (locked, where the database supports it) and
+        updated in one bulk upsert, with the counter changes worked out in
+        between.
+        """
+        # One row per (user, lesson): the last record in the batch wins
+        given = {(row["user_id"], row["lesson_id"]): row for row in records}
+        if not given:
+            return
+        now = _utc(datetime.now(timezone.utc))
+        table = ProgressRecord.__table__
+        with SessionLocal.begin() as session:
+            inserted = set(session.execute(
+                _insert(table)
+                .values([_progress_row(row, now) for row in given.values()])
+                .on_conflict_do_nothing()
+                .returning(table.c.user_id, table.c.lesson_id)
+            ).tuples())
+            existing = [key for key in given if key not in inserted]
+            previous = {}
+            if existing:
+                found = session.execute(
+                    select(ProgressRecord.user_id, ProgressRecord.lesson_id,
+                           ProgressRecord.completed, ProgressRecord.completed_at)
+                    .where(tuple_(ProgressRecord.user_id, ProgressRecord.lesson_id).in_(existing))
+                    .with_for_update()
+                )
+                previous = {(record.user_id, record.lesson_id): record for record in found}
+                _upsert(session, ProgressRecord, [
+                    _progress_row(given[key], now, previous.get(key)) for key in existing
+                ])
+
+            deltas: Dict[StatKey, List[int]] = {}
+            groups = self._lesson_groups(session, {lesson_id for _, lesson_id in given})
+            for key, row in given.items():
+                old = previous.get(key)
+                new = _progress_row(row, now, old)
+                started = int(key in inserted)
+                completed = int(new["completed"]) - int(bool(old is not None and old.completed))
+                if started or completed:
+                    _tally(deltas, [("all", ""), ("user", str(key[0])), *groups[key[1]]], started, completed)
+                old_hour = completion_hour(old.completed, old.completed_at) if old is not None else None
+                new_hour = completion_hour(new["completed"], new["completed_at"])
+                if old_hour != new_hour:
+                    if old_hour is not None:
+                        _tally(deltas, [("hour", old_hour)], 0, -1)
+                    if new_hour is not None:
+                        _tally(deltas, [("hour", new_hour)], 0, 1)
+            self._add_stats(session, deltas)
+
+    @staticmethod
+    def _lesson_groups(session, lesson_ids: Iterable[int]) -> Dict[int, List[StatKey]]:
+        records = session.execute(
+            select(LessonRecord.id, LessonRecord.category, LessonRecord.difficulty)
+            .where(LessonRecord.id.in_(list(lesson_ids)))
+        )
+        groups = {
+            lesson_id: [("lesson", str(lesson_id)), ("category", category), ("difficulty", difficulty)]
+            for lesson_id, category, difficulty in records
+        }
+        return {lesson_id: groups.get(lesson_id, [("lesson", str(lesson_id))]) for lesson_id in lesson_ids}
+
+    @staticmethod
+    def _add_stats(session, deltas: Dict[StatKey, List[int]]):
+        rows = [
+            {"scope": scope, "key": key, "started": started, "completed": completed}
+            for (scope, key), (started, completed) in deltas.items()
+            if started or completed
+        ]
+        if not rows:
+            return
+        table = ProgressStatRecord.__table__
+        statement = _insert(table).values(rows)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=["scope", "key"],
+            set_={
+                "started": table.c.started + statement.excluded.started,
+                "completed": table.c.completed + statement.excluded.completed,
+            },
+        ))
+
+    def stats(self, scopes: Iterable[str], hours: Iterable[str] = ()) -> Dict[StatKey, Tuple[int, int]]:
+        """(started, completed) for every group in scopes and the given hour buckets"""
+        condition = ProgressStatRecord.scope.in_(list(scopes))
+        hours = list(hours)
+        if hours:
+            condition = or_(condition, (ProgressStatRecord.scope == "hour") & ProgressStatRecord.key.in_(hours))
+        with SessionLocal() as session:
+            records = session.scalars(select(ProgressStatRecord).where(condition))
+            return {(record.scope, record.key): (record.started, record.completed) for record in records}
+
+    def stat(self, scope: str, key: str) -> Tuple[int, int]:
+        with SessionLocal() as session:
+            record = session.get(ProgressStatRecord, (scope, key))
+            return (record.started, record.completed) if record else (0, 0)
+
+    def rebuild_stats(self):
+        """Recount every counter from the progress table
+
+        For progress written before the counters existed, or after lessons
+        move to another category or difficulty.
+        """
+        with SessionLocal.begin() as session:
+            # Concurrent rebuilds (every worker runs ensure_stats) would add
+            # up each other's counts. SQLite serializes writers already; on
+            # PostgreSQL hold the table, and progress writes with it, until
+            # the recount commits.
+            if engine.dialect.name == "postgresql":
+                session.execute(text("LOCK TABLE progress_stats IN EXCLUSIVE MODE"))
+            session.execute(delete(ProgressStatRecord))
+            lesson_ids = session.scalars(select(ProgressRecord.lesson_id).distinct())
+            groups = self._lesson_groups(session, set(lesson_ids))
+            records = session.execute(
+                select(ProgressRecord.user_id, ProgressRecord.lesson_id, ProgressRecord.completed,
+                       ProgressRecord.completed_at)
+                .execution_options(yield_per=1000)
+            )
+            deltas: Dict[StatKey, List[int]] = {}
+            for record in records:
+                _tally(deltas, [("all", ""), ("user", str(record.user_id)), *groups[record.lesson_id]],
+                       1, int(record.completed))
+                hour = completion_hour(record.completed, record.completed_at)
+                if hour is not None:
+                    _tally(deltas, [("hour", hour)], 0, 1)
+            self._add_stats(session, deltas)
+
+    def ensure_stats(self):
+        """Backfill the counters if there is progress they don't account for yet"""
+        with SessionLocal() as session:
+            counted = session.get(ProgressStatRecord, ("all", "")) is not None
+            if counted or session.scalar(select(ProgressRecord.user_id).limit(1)) is None:
+                return
+        self.rebuild_stats()
+
+    def get(self, user_id: int, lesson_id: int) -> Optional[dict]:
+        with SessionLocal() as session:
+            record = session.get(ProgressRecord, (user_id, lesson_id))
+            return _as_dict(record) if record else None
+
+    def for_user(self, user_id: int) -> List[dict]:
+        with SessionLocal() as session:
+            records = session.scalars(
+                select(ProgressRecord)
+                .where(ProgressRecord.user_id == user_id)
+                .order_by(ProgressRecord.lesson_id)
+            )
+            return [_as_dict(record) for record in records]
+
+    def for_lesson(self, lesson_id: int) -> List[dict]:
+        with SessionLocal() as session:
+            records = session.scalars(
+                select(ProgressRecord)
+                .where(ProgressRecord.lesson_id == lesson_id)
+                .order_by(ProgressRecord.user_id)
+            )
+            return [_as_dict(record) for record in records]
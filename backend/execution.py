@@ -0,0 +1,307 @@
+"""Warm interpreter pool and scheduler used to run code for /execute.
+
+Starting `python3` for every snippet means paying interpreter startup and
+site imports before any user code runs. Instead we keep `pool_size`
+sandbox_worker.py processes started ahead of time and hand them snippets over
+a pipe. Workers fork a fresh child per job, and are replaced after
+`max_jobs_per_worker` jobs or as soon as anything goes wrong with them.
+
+Running a job blocks until the snippet finishes, so the API never calls the
+pool from the event loop directly; ExecutionScheduler runs jobs on its own
+threads, caps how many run at once and sheds load once its queue is full.
+"""
+import asyncio
+import functools
+import json
+import math
+import os
+import secrets
+import select
+import struct
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import metrics
+
+PYTHON_EXECUTABLE = os.getenv("PYTHON_EXECUTABLE", "python3")
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+HEADER = struct.Struct(">I")
+
+# Extra time the worker gets to report back after the snippet's own timeout
+# before we consider the worker itself hung
+REPLY_GRACE_SECONDS = 5
+
+
+@functools.lru_cache(maxsize=None)
+def interpreter_version() -> str:
+    """Full version string of the interpreter that runs snippets"""
+    result = subprocess.run(
+        [PYTHON_EXECUTABLE, "-c", "import sys; print(sys.version)"],
+        capture_output=True,
+        text=True,
+        timeout=10,
+    )
+    return result.stdout.strip()
+
+
+class WorkerError(Exception):
+    """The worker process died or stopped answering"""
+
+
+class InterpreterWorker:
+    def __init__(self):
+        started = time.perf_counter()
+        self.process = subprocess.Popen(
+            [PYTHON_EXECUTABLE, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        metrics.execution_spawn_seconds.observe(time.perf_counter() - started)
+        self.jobs_run = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def messages(self, code: str, timeout: float, stream: bool = False,
+                 max_output_bytes: Optional[int] = None, limits: Optional[dict] = None,
+                 virtual_clock: bool = False, reports: bool = False):
+        """Send a job and yield the worker's messages up to the result
+
+        limits may set "cpu_seconds", "memory_bytes" and "processes".
+        virtual_clock runs the code against a simulated clock on which
+        sleeps finish instantly. reports gives the code a report pipe on
+        fd 3, returned separately from its output (see sandbox_worker).
+        """
+        self.jobs_run += 1
+        job_id = secrets.token_hex(16)
+        body = json.dumps({
+            "id": job_id,
+            "code": code,
+            "timeout": timeout,
+            "stream": stream,
+            "max_output_bytes": max_output_bytes,
+            "limits": limits,
+            "virtual_clock": virtual_clock,
+            "reports": reports,
+        }).encode()
+        try:
+            self.process.stdin.write(HEADER.pack(len(body)) + body)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"worker stopped accepting jobs: {e}")
+
+        deadline = time.monotonic() + timeout + REPLY_GRACE_SECONDS
+        while True:
+            header = self._read(HEADER.size, deadline)
+            message = json.loads(self._read(HEADER.unpack(header)[0], deadline))
+            # Anything else didn't come from the worker's handling of this
+            # job; the caller then discards the worker
+            if message.get("job") != job_id or message.get("type") not in ("chunk", "result") or (
+                message["type"] == "chunk" and not stream
+            ):
+                raise WorkerError("worker sent a frame that doesn't belong to this job")
+            yield message
+            if message["type"] == "result":
+                return
+
+    def _read(self, size: int, deadline: float) -> bytes:
+        fd = self.process.stdout.fileno()
+        data = b""
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise WorkerError("worker did not answer in time")
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                raise WorkerError("worker exited unexpectedly")
+            data += chunk
+        return data
+
+    def close(self):
+        if self.alive:
+            # SIGTERM lets the worker kill a job it is still running
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+
+class WorkerPool:
+    """Hands out warm workers and recycles them after each job"""
+
+    def __init__(self, size: int, max_jobs_per_worker: int):
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._idle: list = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self):
+        with self._lock:
+            self._closed = False
+            while len(self._idle) < self.size:
+                self._idle.append(InterpreterWorker())
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+
+    def run(self, code: str, timeout: float, max_output_bytes: Optional[int] = None,
+            limits: Optional[dict] = None, virtual_clock: bool = False, reports: bool = False) -> dict:
+        """Run code to completion and return its buffered result"""
+        *_, result = self._messages(code, timeout, False, max_output_bytes, limits, virtual_clock, reports)
+        return result
+
+    def stream(self, code: str, timeout: float, max_output_bytes: Optional[int] = None,
+               limits: Optional[dict] = None, virtual_clock: bool = False):
+        """Yield output chunks as the code produces them, then the result"""
+        yield from self._messages(code, timeout, True, max_output_bytes, limits, virtual_clock)
+
+    def _messages(self, code: str, timeout: float, stream: bool,
+                  max_output_bytes: Optional[int], limits: Optional[dict], virtual_clock: bool,
+                  reports: bool = False):
+        worker = self._acquire()
+        finished = False
+        try:
+            for message in worker.messages(code, timeout, stream, max_output_bytes, limits, virtual_clock,
+                                           reports):
+                if message["type"] == "result":
+                    self._record(message)
+                yield message
+            finished = True
+        finally:
+            if finished:
+                self._release(worker)
+            else:
+                # Failed, or abandoned by the consumer mid-job: the worker
+                # may still be busy, so throw it away
+                worker.close()
+                self._replenish()
+
+    @staticmethod
+    def _record(result: dict):
+        metrics.execution_run_seconds.observe(result["wall_time_ms"] / 1000)
+        metrics.execution_results_total.inc(result["exit_reason"])
+        if result["timed_out"]:
+            metrics.execution_timeouts_total.inc()
+
+    @property
+    def idle_workers(self) -> int:
+        return len(self._idle)
+
+    def _acquire(self) -> InterpreterWorker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive:
+                    return worker
+                worker.close()
+        # Pool exhausted (or not started yet): fall back to a fresh worker
+        return InterpreterWorker()
+
+    def _release(self, worker: InterpreterWorker):
+        retire = not worker.alive or worker.jobs_run >= self.max_jobs_per_worker
+        with self._lock:
+            if not retire and not self._closed and len(self._idle) < self.size:
+                self._idle.append(worker)
+                return
+        worker.close()
+        self._replenish()
+
+    def _replenish(self):
+        # Popen returns as soon as the child is exec'd, so the new worker's
+        # interpreter startup overlaps with whatever we do next
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(InterpreterWorker())
+
+
+class QueueFullError(Exception):
+    """Too many executions are already running or waiting"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"execution queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ExecutionScheduler:
+    """Runs blocking jobs off the event loop with bounded concurrency
+
+    At most `max_concurrency` jobs run at once and at most `max_queue` more
+    wait for a slot. Anything beyond that is rejected immediately with
+    QueueFullError instead of piling up behind slow snippets.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = threading.Semaphore(max_concurrency)
+        # One thread per admitted job, so waiting happens on our semaphore
+        # (where we can see it) rather than inside the executor's queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency + max_queue,
+            thread_name_prefix="execution",
+        )
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._avg_run_seconds = 1.0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def submit(self, fn, *args) -> asyncio.Future:
+        """Queue fn(*args) for a slot
+
+        Raises QueueFullError straight away when there is no room, so callers
+        can reject the request before committing to a response. The returned
+        future resolves to (result, queue_depth, queue_wait_seconds).
+        """
+        with self._lock:
+            if self._waiting + self._running >= self.max_concurrency + self.max_queue:
+                raise QueueFullError(self._retry_after())
+            depth = self._waiting
+            self._waiting += 1
+
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            self._executor, self._run, time.monotonic(), depth, fn, args
+        )
+
+    def _run(self, enqueued_at: float, depth: int, fn, args):
+        with self._slots:
+            started_at = time.monotonic()
+            metrics.execution_queue_wait_seconds.observe(started_at - enqueued_at)
+            with self._lock:
+                self._waiting -= 1
+                self._running += 1
+            try:
+                return fn(*args), depth, started_at - enqueued_at
+            finally:
+                elapsed = time.monotonic() - started_at
+                with self._lock:
+                    self._running -= 1
+                    self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * elapsed
+
+    def _retry_after(self) -> int:
+        # Rough time for the current backlog to drain through our slots
+        backlog = self._waiting + self._running
+        return max(1, math.ceil(self._avg_run_seconds * backlog / self.max_concurrency))
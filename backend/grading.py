@@ -0,0 +1,374 @@
+"""Grading of lesson submissions against the lesson's test cases.
+
+A test case either feeds the submission stdin and compares what it prints
+with expected_stdout, or calls a function it defines and compares the
+return value with an expected Python literal:
+
+    {"name": "prints a greeting", "stdin": "Ana\\n", "expected_stdout": "Hello, Ana!"}
+    {"name": "adds", "call": "add_numbers(2, 3)", "expected": "5"}
+
+All cases of a submission run in one sandbox job. The job runs a harness
+that never executes the submission itself: it forks a child for each stdin
+case and one shared child for the function cases, and only those children
+run the submission's code. A child answers each case with repr() of the
+value returned, or what was printed, and the harness times it and writes a
+JSON report line to the job's report pipe (sandbox_worker.REPORT_FD), which
+the children have closed. Reports go out as soon as a case finishes, so a
+run that times out still accounts for the cases before it. Whether a case
+passed is decided here, in the API process, not in the sandbox. A child
+killed by a resource limit is reported as such, on its case and in the
+submission's exit_reason.
+"""
+import ast
+import difflib
+import json
+from typing import List, Optional
+
+# Longest actual output or repr a case reports back, in characters
+MAX_CASE_OUTPUT = 4096
+MAX_DIFF_LINES = 40
+# Where sandbox_worker puts the report pipe of jobs sent with reports=True
+REPORT_FD = 3
+
+HARNESS = r'''
+import contextlib as _contextlib
+import io as _io
+import json as _json
+import os as _os
+import resource as _resource
+import select as _select
+import signal as _signal
+import sys as _sys
+import time as _time
+import traceback as _traceback
+
+# What a child may say about a case; anything else is ignored
+_REPLY_FIELDS = {"actual": str, "output": str, "output_truncated": bool, "error": str}
+# How long a child that closed its pipe gets to finish dying, and how often
+# to check on it meanwhile
+_EXIT_GRACE_SECONDS = 1
+_EXIT_POLL_SECONDS = 0.01
+
+
+def _describe(exc):
+    return "".join(_traceback.format_exception_only(type(exc), exc)).strip()
+
+
+def _set_dumpable(value):
+    # A process that isn't dumpable can't be ptraced, or have its /proc fds
+    # reopened, by other processes of the same user
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(4, value, 0, 0, 0)  # PR_SET_DUMPABLE
+    except Exception:
+        pass
+
+
+def _answer(code, cases, limit, commands, replies, functions):
+    """Run the cases the harness asks for; the only place the submission runs
+
+    The child for function cases runs the module body once, up front, and
+    says "ready" so anything it writes before being asked shows up as such.
+    """
+    namespace = setup_error = None
+    with _os.fdopen(commands) as incoming, _os.fdopen(replies, "w") as outgoing:
+        if functions:
+            namespace = {"__name__": "__main__"}
+            _sys.stdin = _io.StringIO("")
+            try:
+                with _contextlib.redirect_stdout(_io.StringIO()):
+                    exec(code, namespace)
+            except SystemExit:
+                pass
+            except BaseException as exc:
+                setup_error = _describe(exc)
+            outgoing.write("ready\n")
+            outgoing.flush()
+        for line in incoming:
+            case = cases[int(line)]
+            reply = {}
+            captured = _io.StringIO()
+            try:
+                with _contextlib.redirect_stdout(captured):
+                    if "call" in case:
+                        if setup_error is not None:
+                            reply["error"] = setup_error
+                        else:
+                            reply["actual"] = repr(eval(case["call"], namespace))[:limit]
+                    else:
+                        _sys.stdin = _io.StringIO(case.get("stdin") or "")
+                        try:
+                            exec(code, {"__name__": "__main__"})
+                        except SystemExit as exc:
+                            if exc.code not in (None, 0):
+                                raise
+            except BaseException as exc:
+                reply["error"] = _describe(exc)
+            if "call" not in case:
+                output = captured.getvalue()
+                reply.update(output=output[:limit], output_truncated=len(output) > limit)
+            outgoing.write(_json.dumps(reply) + "\n")
+            outgoing.flush()
+
+
+class _Child:
+    """A forked child answering cases over a pair of pipes"""
+
+    open_fds = []
+
+    def __init__(self, code, cases, limit, report_fd, functions):
+        commands_r, commands_w = _os.pipe()
+        replies_r, replies_w = _os.pipe()
+        self.pid = _os.fork()
+        if self.pid == 0:
+            for fd in (report_fd, commands_w, replies_r, *_Child.open_fds):
+                _os.close(fd)
+            _set_dumpable(1)
+            try:
+                _answer(code, cases, limit, commands_r, replies_w, functions)
+            finally:
+                _os._exit(0)
+        _os.close(commands_r)
+        _os.close(replies_w)
+        self.commands, self.replies = commands_w, replies_r
+        _Child.open_fds.extend((commands_w, replies_r))
+        self.pending = b""
+        self.ready = not functions
+
+    def _readline(self):
+        while b"\n" not in self.pending:
+            chunk = _os.read(self.replies, 65536)
+            if not chunk:
+                return None
+            self.pending += chunk
+        line, _, self.pending = self.pending.partition(b"\n")
+        return line.decode(errors="replace")
+
+    def ask(self, index):
+        """The child's raw reply to a case
+
+        None if it died first, "" if it spoke out of turn: a reply that
+        arrives before the question can't be an answer to it.
+        """
+        if not self.ready:
+            line = self._readline()
+            if line is None:
+                return None
+            if line != "ready":
+                return ""
+            self.ready = True
+        if self.pending or _select.select([self.replies], [], [], 0)[0]:
+            return "" if self.pending or _os.read(self.replies, 65536) else None
+        try:
+            _os.write(self.commands, f"{index}\n".encode())
+        except BrokenPipeError:
+            return None
+        return self._readline()
+
+    def close(self, grace=0):
+        """Reap the child, killing it unless it exits within grace seconds
+
+        Returns its wait status and CPU time if it exited on its own.
+        """
+        for fd in (self.commands, self.replies):
+            _Child.open_fds.remove(fd)
+            _os.close(fd)
+        deadline = _time.monotonic() + grace
+        while True:
+            pid, status, usage = _os.wait4(self.pid, _os.WNOHANG)
+            if pid:
+                return status, usage.ru_utime + usage.ru_stime
+            if _time.monotonic() >= deadline:
+                break
+            # Not time.sleep: under a virtual clock it wouldn't wait
+            _select.select([], [], [], _EXIT_POLL_SECONDS)
+        # Its answers are in; whatever it's still doing doesn't count
+        _os.kill(self.pid, _signal.SIGKILL)
+        _os.waitpid(self.pid, 0)
+        return None
+
+
+def _death(ended):
+    """Why a child that left a case unanswered ended, as (error, exit_reason)"""
+    if ended is None or not _os.WIFSIGNALED(ended[0]):
+        return "Submission exited before this case finished", None
+    signum, cpu_seconds = _os.WTERMSIG(ended[0]), ended[1]
+    cpu_limit = _resource.getrlimit(_resource.RLIMIT_CPU)[0]
+    # Like sandbox_worker.exit_reason: SIGXCPU is the soft CPU limit, SIGKILL
+    # the hard one or, short of it, the kernel reclaiming memory
+    if signum == _signal.SIGXCPU or (
+        signum == _signal.SIGKILL and cpu_limit != _resource.RLIM_INFINITY and cpu_seconds >= cpu_limit
+    ):
+        return f"Submission exceeded the CPU time limit (max {cpu_limit} seconds)", "cpu_limit"
+    if signum == _signal.SIGKILL:
+        return "Submission was killed, most likely for using too much memory", "memory_limit"
+    return f"Submission crashed ({_signal.Signals(signum).name})", "crash"
+
+
+def _clean(raw, limit):
+    try:
+        reply = _json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(reply, dict):
+        return None
+    clean = {}
+    for field, kind in _REPLY_FIELDS.items():
+        if field in reply:
+            if type(reply[field]) is not kind:
+                return None
+            clean[field] = reply[field][:limit] if kind is str else reply[field]
+    return clean
+
+
+def _grade(source, cases, limit, report_fd):
+    _set_dumpable(0)
+    report = _os.fdopen(report_fd, "w")
+    try:
+        code = compile(source, "<string>", "exec")
+    except SyntaxError as exc:
+        code, compile_error = None, _describe(exc)
+
+    functions = None
+    for index, case in enumerate(cases):
+        started = _time.perf_counter()
+        if code is None:
+            reply = {"error": compile_error}
+        else:
+            if "call" in case:
+                if functions is None:
+                    functions = _Child(code, cases, limit, report_fd, functions=True)
+                child = functions
+            else:
+                child = _Child(code, cases, limit, report_fd, functions=False)
+            raw = child.ask(index)
+            reply = None if raw is None else _clean(raw, limit)
+            if reply is None:
+                # Never ask a child that died or can't be trusted again
+                if child is functions:
+                    functions = None
+                if raw is None:
+                    error, exit_reason = _death(child.close(_EXIT_GRACE_SECONDS))
+                    reply = {"error": error}
+                    if exit_reason is not None:
+                        reply["exit_reason"] = exit_reason
+                else:
+                    reply = {"error": "Submission wrote to the grader out of turn"}
+                    child.close()
+            elif child is not functions:
+                child.close()
+        reply.update(case=index, duration_ms=round((_time.perf_counter() - started) * 1000, 3))
+        report.write(_json.dumps(reply) + "\n")
+        report.flush()
+    if functions is not None:
+        functions.close()
+'''
+
+
+def build_program(code: str, cases: List[dict], report_fd: int = REPORT_FD) -> str:
+    """Source that runs code against every case and reports to report_fd"""
+    return (
+        HARNESS
+        + f"\n_grade({code!r}, _json.loads({json.dumps(cases)!r}), {MAX_CASE_OUTPUT}, {report_fd})\n"
+    )
+
+
+def normalize_output(text: str) -> str:
+    """Ignore trailing whitespace on lines and blank lines at the end"""
+    return "\n".join(line.rstrip() for line in text.rstrip().splitlines())
+
+
+def expected_repr(expected: str) -> str:
+    try:
+        return repr(ast.literal_eval(expected))
+    except (ValueError, SyntaxError):
+        return expected
+
+
+def values_match(expected: str, actual: Optional[str]) -> bool:
+    """Compare an expected literal with the repr a submission reported
+
+    Both sides are parsed as plain literals, so no object of the
+    submission's choosing takes part in the comparison.
+    """
+    if actual is None:
+        return False
+    try:
+        return ast.literal_eval(expected) == ast.literal_eval(actual)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return False
+
+
+def output_diff(expected: str, actual: str) -> str:
+    lines = list(difflib.unified_diff(
+        expected.splitlines(), actual.splitlines(), "expected", "actual", lineterm="", n=1,
+    ))
+    if len(lines) > MAX_DIFF_LINES:
+        lines = lines[:MAX_DIFF_LINES] + [f"... {len(lines) - MAX_DIFF_LINES} more lines"]
+    return "\n".join(lines)
+
+
+def exit_reason(reported: List[dict], run_reason: str) -> str:
+    """Why the grading run ended, or why a case's child was killed if it ended fine
+
+    Every case runs in a child of the harness, so a limit that kills one
+    doesn't show in how the run itself ended.
+    """
+    if run_reason == "ok":
+        for report in reported:
+            if report.get("exit_reason"):
+                return report["exit_reason"]
+    return run_reason
+
+
+def parse_results(reports: str) -> List[dict]:
+    """Reports written by the harness; a line cut off by the output limit is dropped"""
+    results = []
+    for line in reports.splitlines():
+        try:
+            results.append(json.loads(line))
+        except ValueError:
+            break
+    return results
+
+
+def fail_all(cases: List[dict], error: str) -> List[dict]:
+    """Results for a submission that couldn't run at all"""
+    return [
+        {"name": case.get("name") or f"case {index + 1}", "passed": False, "duration_ms": None, "error": error}
+        for index, case in enumerate(cases)
+    ]
+
+
+def grade(cases: List[dict], reported: List[dict], failure: Optional[str] = None) -> List[dict]:
+    """Per-case results from what the harness reported
+
+    failure explains why the run ended early, if it did; it is charged to
+    the first case without a report.
+    """
+    reports = {report["case"]: report for report in reported}
+    results = []
+    unreported = False
+    for index, case in enumerate(cases):
+        name = case.get("name") or f"case {index + 1}"
+        report = reports.get(index)
+        if report is None:
+            error = "Not run" if unreported else failure or "Submission exited before this case finished"
+            unreported = True
+            results.append({"name": name, "passed": False, "duration_ms": None, "error": error})
+            continue
+
+        result = {"name": name, "passed": False, "duration_ms": report["duration_ms"], "error": report.get("error")}
+        if "call" in case:
+            result.update(expected=expected_repr(case["expected"]), actual=report.get("actual"))
+            result["passed"] = result["error"] is None and values_match(case["expected"], result["actual"])
+        else:
+            expected, actual = case.get("expected_stdout", ""), report.get("output", "")
+            result.update(expected=expected, actual=actual)
+            result["passed"] = result["error"] is None and normalize_output(expected) == normalize_output(actual)
+            if report.get("output_truncated"):
+                result["passed"] = False
+        if not result["passed"] and result.get("actual") is not None:
+            result["diff"] = output_diff(result["expected"], result["actual"])
+        results.append(result)
+    return results
@@ -0,0 +1,131 @@
+"""Pre-serialized lesson catalog responses.
+
+The catalog only changes when lessons are (re)loaded, so every response body
+for /lessons and /lessons/{id} is rendered, gzipped and hashed once per
+catalog, the first time it's asked for. Rendering is deferred so lessons
+nobody opens never have their bodies read. Requests then just pick the right
+bytes, and clients that already hold the current version get a 304 from its
+strong ETag.
+"""
+import gzip
+import hashlib
+import json
+from functools import cached_property
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+from fastapi import Response
+
+SUMMARY_FIELDS = ("id", "title", "description", "difficulty", "category")
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_SIZE = 512
+
+
+def _dumps(value) -> bytes:
+    # Same encoding FastAPI's JSONResponse uses
+    if isinstance(value, Mapping) and not isinstance(value, dict):
+        value = dict(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _json_array(items: List[bytes]) -> bytes:
+    return b"[" + b",".join(items) + b"]"
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _etag_matches(if_none_match: str, etags: Iterable[str]) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+class Payload(NamedTuple):
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+
+    @classmethod
+    def build(cls, body: bytes, precompress: bool = True) -> "Payload":
+        gzipped = None
+        if precompress and len(body) >= GZIP_MIN_SIZE:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        return cls(body, gzipped, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    @property
+    def gzip_etag(self) -> str:
+        # Each representation needs its own strong validator
+        return self.etag[:-1] + '-gzip"'
+
+    def respond(self, request_headers, headers: Optional[dict] = None) -> Response:
+        headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache", **(headers or {})}
+        use_gzip = self.gzipped is not None and _accepts_gzip(request_headers.get("accept-encoding", ""))
+        headers["ETag"] = self.gzip_etag if use_gzip else self.etag
+
+        if _etag_matches(request_headers.get("if-none-match", ""), (self.etag, self.gzip_etag)):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzipped, media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class LessonCatalog:
+    """Immutable snapshot of the lessons with their rendered responses"""
+
+    def __init__(self, lessons: Iterable[Mapping]):
+        self.lessons = {lesson["id"]: lesson for lesson in sorted(lessons, key=lambda lesson: lesson["id"])}
+        self._ids = list(self.lessons)
+        self._by_id: Dict[int, Payload] = {}
+
+    @cached_property
+    def _items(self) -> List[bytes]:
+        return [_dumps(lesson) for lesson in self.lessons.values()]
+
+    @cached_property
+    def _summary_items(self) -> List[bytes]:
+        return [
+            _dumps({field: lesson[field] for field in SUMMARY_FIELDS})
+            for lesson in self.lessons.values()
+        ]
+
+    @cached_property
+    def _all(self) -> Payload:
+        return Payload.build(_json_array(self._items))
+
+    @cached_property
+    def _all_summaries(self) -> Payload:
+        return Payload.build(_json_array(self._summary_items))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def list_response(self, request_headers, summary: bool = False,
+                      offset: int = 0, limit: Optional[int] = None) -> Response:
+        headers = {"X-Total-Count": str(len(self._ids))}
+        if offset == 0 and limit is None:
+            payload = self._all_summaries if summary else self._all
+            return payload.respond(request_headers, headers)
+
+        items = self._summary_items if summary else self._items
+        end = len(items) if limit is None else offset + limit
+        # Pages are cheap to splice together from the rendered items
+        payload = Payload.build(_json_array(items[offset:end]), precompress=False)
+        return payload.respond(request_headers, headers)
+
+    def lesson_response(self, lesson_id: int, request_headers) -> Optional[Response]:
+        payload = self._by_id.get(lesson_id)
+        if payload is None:
+            lesson = self.lessons.get(lesson_id)
+            if lesson is None:
+                return None
+            # Racing renders produce identical bytes, so last write wins harmlessly
+            payload = self._by_id[lesson_id] = Payload.build(_dumps(lesson))
+        return payload.respond(request_headers)
@@ -0,0 +1,170 @@
+"""Lesson catalog stored on disk, loaded lazily and reloaded when edited.
+
+lessons/catalog.json lists each lesson's id, title, description, difficulty,
+category and the directory holding its body (content.md, example.py and,
+for graded lessons, tests.json with the test cases; see grading).
+Loading the catalog only parses catalog.json; each part of a lesson's body
+(content, code example, test cases) is read the first time something asks
+for that part, so running the examples doesn't load the content. The library
+remembers the size and mtime of every file it loaded from, so a poller can
+cheaply tell when an edit calls for a reload.
+"""
+import json
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "catalog.json"
+SUMMARY_FIELDS = ("id", "title", "description", "difficulty", "category")
+BODY_FILES = {"content": "content.md", "code_example": "example.py"}
+# Optional; lessons without it have no test cases
+TEST_CASES_FILE = "tests.json"
+BODY_FIELDS = (*BODY_FILES, "test_cases")
+# Field order of the lesson JSON the API returns
+LESSON_FIELDS = ("id", "title", "description", "content", "code_example", "difficulty", "category", "test_cases")
+
+FileStat = Tuple[str, Optional[int], Optional[int]]
+
+
+def _stat(path: str) -> FileStat:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (path, None, None)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def read_body_file(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    # Files end with a newline; the strings served never did
+    return text[:-1] if text.endswith("\n") else text
+
+
+class LazyLesson(Mapping):
+    """Read-only lesson whose body fields (content, example, test cases) each load on first access"""
+
+    def __init__(self, entry: dict, directory: str):
+        missing = [field for field in (*SUMMARY_FIELDS, "path") if field not in entry]
+        if missing:
+            raise ValueError(f"lesson {entry.get('id')!r} is missing {', '.join(missing)}")
+        self._summary = {field: entry[field] for field in SUMMARY_FIELDS}
+        self._paths = {
+            field: os.path.join(directory, entry["path"], filename)
+            for field, filename in BODY_FILES.items()
+        }
+        self._test_cases_path = os.path.join(directory, entry["path"], TEST_CASES_FILE)
+        self._body: dict = {}
+        self._lock = threading.Lock()
+        # Identifies this version of the lesson without reading its body
+        self.fingerprint = (tuple(self._summary.items()), tuple(_stat(path) for path in self.body_paths))
+
+    @property
+    def required_paths(self) -> List[str]:
+        return list(self._paths.values())
+
+    @property
+    def body_paths(self) -> List[str]:
+        return [*self._paths.values(), self._test_cases_path]
+
+    @property
+    def body_loaded(self) -> bool:
+        """Whether any part of the body has been read"""
+        return bool(self._body)
+
+    def loaded(self, field: str) -> bool:
+        return field in self._body
+
+    def _read_field(self, field: str):
+        if field != "test_cases":
+            return read_body_file(self._paths[field])
+        if not os.path.exists(self._test_cases_path):
+            return []
+        with open(self._test_cases_path, "rb") as f:
+            return json.loads(f.read())["cases"]
+
+    def _load_field(self, field: str):
+        try:
+            return self._body[field]
+        except KeyError:
+            pass
+        with self._lock:
+            if field not in self._body:
+                self._body[field] = self._read_field(field)
+            return self._body[field]
+
+    def __getitem__(self, key: str):
+        if key in BODY_FIELDS:
+            return self._load_field(key)
+        return self._summary[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(LESSON_FIELDS)
+
+    def __len__(self) -> int:
+        return len(LESSON_FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, LazyLesson):
+            return self.fingerprint == other.fingerprint
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"LazyLesson(id={self._summary['id']!r}, title={self._summary['title']!r})"
+
+
+class LessonLibrary:
+    """Loads lessons from a catalog directory and notices when it changes"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._paths: List[str] = []
+        self._signature: Optional[Tuple[FileStat, ...]] = None
+
+    def _current_signature(self) -> Tuple[FileStat, ...]:
+        return tuple(_stat(path) for path in (self.index_path, *self._paths))
+
+    def load(self) -> List[LazyLesson]:
+        """Parse the index; bodies are left on disk until they're needed"""
+        # Stat before reading so an edit made mid-read still shows up as a change
+        index_stat = _stat(self.index_path)
+        with open(self.index_path, "rb") as f:
+            entries = json.loads(f.read())["lessons"]
+
+        lessons = [LazyLesson(entry, self.directory) for entry in entries]
+        ids = [lesson["id"] for lesson in lessons]
+        if len(set(ids)) != len(ids):
+            raise ValueError(f"{self.index_path} lists a lesson id more than once")
+        missing = [path for lesson in lessons for path in lesson.required_paths if not os.path.exists(path)]
+        if missing:
+            raise ValueError(f"lesson files not found: {', '.join(missing)}")
+
+        self._paths = [path for lesson in lessons for path in lesson.body_paths]
+        self._signature = (index_stat, *(lesson_stat for lesson in lessons for lesson_stat in lesson.fingerprint[1]))
+        return lessons
+
+    def changed(self) -> bool:
+        return self._signature is not None and self._current_signature() != self._signature
+
+    def reload_if_changed(self) -> Optional[List[LazyLesson]]:
+        """Freshly loaded lessons if the files changed since the last load, else None
+
+        A catalog that fails to load (say, caught half-written) is logged and
+        skipped; the caller keeps serving what it has until the next edit.
+        """
+        if not self.changed():
+            return None
+        signature = self._current_signature()
+        try:
+            return self.load()
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning("Keeping the current lessons; %s could not be loaded: %s", self.directory, exc)
+            self._signature = signature
+            return None
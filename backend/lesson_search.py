@@ -0,0 +1,115 @@
+"""Prebuilt indexes for searching and filtering the lesson catalog.
+
+Category and difficulty filters are set lookups, and free text goes through
+an inverted index over title, description and content. Matches in the title
+count more than matches in the description, which count more than the body;
+rarer terms count more than common ones. The index is maintained
+incrementally: sync() only re-indexes lessons that were added, changed or
+removed.
+"""
+import math
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+FIELD_WEIGHTS = {"title": 3.0, "description": 2.0, "content": 1.0}
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "be", "by", "for", "in", "is", "it", "of",
+    "on", "or", "the", "to", "with", "you", "your", "this", "that", "can",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+
+def normalize(token: str) -> str:
+    # Fold simple plurals so "decorator" finds "Decorators"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [normalize(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class LessonSearchIndex:
+    def __init__(self, lessons: Iterable[dict] = ()):
+        self._lessons: Dict[int, dict] = {}
+        self._by_category: Dict[str, Set[int]] = {}
+        self._by_difficulty: Dict[str, Set[int]] = {}
+        # token -> {lesson_id: weighted term frequency}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._lock = threading.Lock()
+        self.sync(lessons)
+
+    def sync(self, lessons: Iterable[dict]):
+        """Bring the index in line with lessons, touching only what changed"""
+        incoming = {lesson["id"]: lesson for lesson in lessons}
+        with self._lock:
+            for lesson_id in list(self._lessons):
+                if lesson_id not in incoming:
+                    self._remove(lesson_id)
+            for lesson_id, lesson in incoming.items():
+                if self._lessons.get(lesson_id) != lesson:
+                    self._remove(lesson_id)
+                    self._add(lesson)
+
+    def _add(self, lesson: dict):
+        lesson_id = lesson["id"]
+        self._lessons[lesson_id] = lesson
+        self._by_category.setdefault(lesson["category"].lower(), set()).add(lesson_id)
+        self._by_difficulty.setdefault(lesson["difficulty"].lower(), set()).add(lesson_id)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(lesson[field]):
+                postings = self._postings.setdefault(token, {})
+                postings[lesson_id] = postings.get(lesson_id, 0.0) + weight
+
+    def _remove(self, lesson_id: int):
+        lesson = self._lessons.pop(lesson_id, None)
+        if lesson is None:
+            return
+        for index, key in ((self._by_category, lesson["category"]), (self._by_difficulty, lesson["difficulty"])):
+            ids = index.get(key.lower())
+            if ids is not None:
+                ids.discard(lesson_id)
+                if not ids:
+                    del index[key.lower()]
+        for field in FIELD_WEIGHTS:
+            for token in set(tokenize(lesson[field])):
+                postings = self._postings.get(token)
+                if postings is not None:
+                    postings.pop(lesson_id, None)
+                    if not postings:
+                        del self._postings[token]
+
+    def search(self, query: str = "", category: Optional[str] = None, difficulty: Optional[str] = None,
+               offset: int = 0, limit: int = 20) -> Tuple[int, List[Tuple[dict, float]]]:
+        """Return (total matches, page of (lesson, score)) ordered by relevance"""
+        with self._lock:
+            candidates: Optional[Set[int]] = None
+            if category:
+                candidates = set(self._by_category.get(category.lower(), ()))
+            if difficulty:
+                ids = self._by_difficulty.get(difficulty.lower(), set())
+                candidates = ids.copy() if candidates is None else candidates & ids
+
+            tokens = tokenize(query)
+            if not tokens:
+                ids = self._lessons.keys() if candidates is None else candidates
+                ranked = [(lesson_id, 0.0) for lesson_id in sorted(ids)]
+            else:
+                scores: Dict[int, float] = {}
+                total_lessons = len(self._lessons)
+                for token in set(tokens):
+                    postings = self._postings.get(token, {})
+                    if not postings:
+                        continue
+                    idf = math.log(1 + total_lessons / len(postings))
+                    for lesson_id, weight in postings.items():
+                        if candidates is None or lesson_id in candidates:
+                            scores[lesson_id] = scores.get(lesson_id, 0.0) + weight * idf
+                ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+            page = ranked[offset:offset + limit]
+            return len(ranked), [(self._lessons[lesson_id], round(score, 4)) for lesson_id, score in page]
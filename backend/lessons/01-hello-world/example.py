@@ -0,0 +1,4 @@
+print('Hello, World!')
+print('Welcome to Python!')
+print(2 + 3)
+print('The result is:', 5)
@@ -0,0 +1,9 @@
+name = 'Alice'
+age = 25
+height = 5.6
+is_student = True
+
+print(f'Name: {name}')
+print(f'Age: {age}')
+print(f'Height: {height}')
+print(f'Student: {is_student}')
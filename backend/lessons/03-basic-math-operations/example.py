@@ -0,0 +1,17 @@
+# Basic arithmetic
+x = 10
+y = 3
+
+addition = x + y
+subtraction = x - y
+multiplication = x * y
+division = x / y
+modulo = x % y
+exponent = x ** y
+
+print(f'Addition: {addition}')
+print(f'Subtraction: {subtraction}')
+print(f'Multiplication: {multiplication}')
+print(f'Division: {division}')
+print(f'Modulo: {modulo}')
+print(f'Exponent: {exponent}')
@@ -0,0 +1,19 @@
+text = 'Hello, Python!'
+
+# String length
+print(f'Length: {len(text)}')
+
+# String slicing
+print(f'First 5 characters: {text[:5]}')
+print(f'Last 6 characters: {text[-6:]}')
+
+# String methods
+print(f'Uppercase: {text.upper()}')
+print(f'Lowercase: {text.lower()}')
+print(f'Title case: {text.title()}')
+
+# String concatenation
+first = 'Hello'
+second = 'World'
+result = first + ' ' + second
+print(f'Concatenated: {result}')
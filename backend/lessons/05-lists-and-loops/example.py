@@ -0,0 +1,20 @@
+fruits = ['apple', 'banana', 'orange']
+
+# Iterating through a list
+for fruit in fruits:
+    print(f'I like {fruit}')
+
+# List comprehension
+squares = [x**2 for x in range(5)]
+print(squares)
+
+# Adding items to a list
+fruits.append('grape')
+print(fruits)
+
+# List methods
+numbers = [3, 1, 4, 1, 5, 9, 2, 6]
+print(f'Original: {numbers}')
+print(f'Sorted: {sorted(numbers)}')
+print(f'Sum: {sum(numbers)}')
+print(f'Max: {max(numbers)}')
@@ -0,0 +1,30 @@
+age = 18
+temperature = 25
+
+# Simple if statement
+if age >= 18:
+    print('You are an adult')
+else:
+    print('You are a minor')
+
+# Multiple conditions
+if temperature < 0:
+    print('It is freezing')
+elif temperature < 20:
+    print('It is cold')
+elif temperature < 30:
+    print('It is warm')
+else:
+    print('It is hot')
+
+# Complex conditions
+score = 85
+if score >= 90:
+    grade = 'A'
+elif score >= 80:
+    grade = 'B'
+elif score >= 70:
+    grade = 'C'
+else:
+    grade = 'F'
+print(f'Grade: {grade}')
@@ -0,0 +1,18 @@
+student = {
+    'name': 'Alice',
+    'age': 20,
+    'grades': [85, 90, 92]
+}
+
+print(f'Student: {student["name"]}')
+print(f'Age: {student["age"]}')
+print(f'Average grade: {sum(student["grades"]) / len(student["grades"])}')
+
+# Adding new key-value pairs
+student['major'] = 'Computer Science'
+print(student)
+
+# Dictionary methods
+print(f'Keys: {list(student.keys())}')
+print(f'Values: {list(student.values())}')
+print(f'Items: {list(student.items())}')
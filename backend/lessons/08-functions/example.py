@@ -0,0 +1,18 @@
+def greet(name):
+    return f'Hello, {name}!'
+
+def add_numbers(a, b):
+    return a + b
+
+def calculate_area(length, width):
+    area = length * width
+    return area
+
+# Using the functions
+message = greet('Alice')
+result = add_numbers(5, 3)
+rectangle_area = calculate_area(10, 5)
+
+print(message)
+print(f'5 + 3 = {result}')
+print(f'Rectangle area: {rectangle_area}')
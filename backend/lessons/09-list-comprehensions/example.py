@@ -0,0 +1,19 @@
+# Basic list comprehension
+squares = [x**2 for x in range(10)]
+print(f'Squares: {squares}')
+
+# List comprehension with condition
+even_squares = [x**2 for x in range(10) if x % 2 == 0]
+print(f'Even squares: {even_squares}')
+
+# Nested list comprehension
+matrix = [[i+j for j in range(3)] for i in range(3)]
+print(f'Matrix: {matrix}')
+
+# Dictionary comprehension
+word_lengths = {word: len(word) for word in ['apple', 'banana', 'cherry']}
+print(f'Word lengths: {word_lengths}')
+
+# Set comprehension
+unique_squares = {x**2 for x in range(10)}
+print(f'Unique squares: {unique_squares}')
@@ -0,0 +1,28 @@
+def divide_numbers(a, b):
+    try:
+        result = a / b
+        return result
+    except ZeroDivisionError:
+        return 'Error: Cannot divide by zero'
+    except TypeError:
+        return 'Error: Please provide numbers'
+
+# Testing the function
+print(divide_numbers(10, 2))
+print(divide_numbers(10, 0))
+print(divide_numbers('10', 2))
+
+# Using try-except with file operations
+try:
+    with open('nonexistent.txt', 'r') as file:
+        content = file.read()
+except FileNotFoundError:
+    print('File not found!')
+
+# Custom exceptions
+try:
+    age = int(input('Enter age: '))
+    if age < 0:
+        raise ValueError('Age cannot be negative')
+except ValueError as e:
+    print(f'Invalid input: {e}')
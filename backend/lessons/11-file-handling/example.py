@@ -0,0 +1,21 @@
+# Writing to a file
+with open('example.txt', 'w') as file:
+    file.write('Hello, this is a test file!\n')
+    file.write('This is the second line.')
+
+# Reading from a file
+with open('example.txt', 'r') as file:
+    content = file.read()
+    print('File content:')
+    print(content)
+
+# Reading line by line
+with open('example.txt', 'r') as file:
+    for line in file:
+        print(f'Line: {line.strip()}')
+
+# Working with CSV-like data
+data = [['Name', 'Age'], ['Alice', '25'], ['Bob', '30']]
+with open('data.csv', 'w') as file:
+    for row in data:
+        file.write(','.join(row) + '\n')
@@ -0,0 +1,24 @@
+class Student:
+    def __init__(self, name, age):
+        self.name = name
+        self.age = age
+        self.grades = []
+    
+    def add_grade(self, grade):
+        self.grades.append(grade)
+    
+    def get_average(self):
+        if not self.grades:
+            return 0
+        return sum(self.grades) / len(self.grades)
+    
+    def __str__(self):
+        return f'Student: {self.name}, Age: {self.age}'
+
+# Creating objects
+student1 = Student('Alice', 20)
+student1.add_grade(85)
+student1.add_grade(90)
+
+print(student1)
+print(f'{student1.name} average: {student1.get_average()}')
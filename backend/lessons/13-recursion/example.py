@@ -0,0 +1,21 @@
+def factorial(n):
+    if n <= 1:
+        return 1
+    return n * factorial(n - 1)
+
+def fibonacci(n):
+    if n <= 1:
+        return n
+    return fibonacci(n - 1) + fibonacci(n - 2)
+
+def count_down(n):
+    if n <= 0:
+        print('Blast off!')
+        return
+    print(n)
+    count_down(n - 1)
+
+# Testing recursive functions
+print(f'Factorial of 5: {factorial(5)}')
+print(f'Fibonacci of 7: {fibonacci(7)}')
+count_down(5)
@@ -0,0 +1,31 @@
+def number_generator(n):
+    for i in range(n):
+        yield i
+
+def fibonacci_generator():
+    a, b = 0, 1
+    while True:
+        yield a
+        a, b = b, a + b
+
+def even_numbers_generator(n):
+    for i in range(n):
+        if i % 2 == 0:
+            yield i
+
+# Using generators
+print('Number generator:')
+for num in number_generator(5):
+    print(num, end=' ')
+print()
+
+print('First 10 Fibonacci numbers:')
+fib = fibonacci_generator()
+for _ in range(10):
+    print(next(fib), end=' ')
+print()
+
+print('Even numbers:')
+for even in even_numbers_generator(10):
+    print(even, end=' ')
+print()
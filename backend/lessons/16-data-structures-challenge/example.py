@@ -0,0 +1,35 @@
+# Implementing a simple cache system
+class Cache:
+    def __init__(self, max_size=3):
+        self.max_size = max_size
+        self.cache = {}
+        self.access_order = []
+    
+    def get(self, key):
+        if key in self.cache:
+            # Move to end (most recently used)
+            self.access_order.remove(key)
+            self.access_order.append(key)
+            return self.cache[key]
+        return None
+    
+    def put(self, key, value):
+        if key in self.cache:
+            self.access_order.remove(key)
+        elif len(self.cache) >= self.max_size:
+            # Remove least recently used
+            lru_key = self.access_order.pop(0)
+            del self.cache[lru_key]
+        
+        self.cache[key] = value
+        self.access_order.append(key)
+
+# Testing the cache
+cache = Cache(3)
+cache.put('A', 1)
+cache.put('B', 2)
+cache.put('C', 3)
+print(f'Cache: {cache.cache}')
+print(f'Get A: {cache.get("A")}')
+cache.put('D', 4)
+print(f'Cache after adding D: {cache.cache}')
@@ -0,0 +1,21 @@
+# Basic lambda function
+square = lambda x: x**2
+print(f'Square of 5: {square(5)}')
+
+# Lambda with multiple arguments
+add = lambda x, y: x + y
+print(f'Sum of 3 and 7: {add(3, 7)}')
+
+# Using lambda with map
+numbers = [1, 2, 3, 4, 5]
+squared = list(map(lambda x: x**2, numbers))
+print(f'Squared numbers: {squared}')
+
+# Using lambda with filter
+even_numbers = list(filter(lambda x: x % 2 == 0, numbers))
+print(f'Even numbers: {even_numbers}')
+
+# Lambda with conditional expression
+check_grade = lambda score: 'Pass' if score >= 60 else 'Fail'
+print(f'Score 75: {check_grade(75)}')
+print(f'Score 45: {check_grade(45)}')
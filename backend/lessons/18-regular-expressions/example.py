@@ -0,0 +1,25 @@
+import re
+
+# Basic pattern matching
+text = 'My phone number is 123-456-7890'
+phone_pattern = r'\d{3}-\d{3}-\d{4}'
+match = re.search(phone_pattern, text)
+if match:
+    print(f'Found phone: {match.group()}')
+
+# Finding all matches
+emails = 'Contact us at john@example.com or jane@test.org'
+email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+found_emails = re.findall(email_pattern, emails)
+print(f'Found emails: {found_emails}')
+
+# Replacing text
+sentence = 'The color is red, the sky is blue, the grass is green'
+color_pattern = r'\b(red|blue|green)\b'
+replaced = re.sub(color_pattern, 'COLOR', sentence)
+print(f'Replaced: {replaced}')
+
+# Splitting text
+csv_data = 'apple,banana,cherry,date'
+split_data = re.split(r',', csv_data)
+print(f'Split data: {split_data}')
@@ -0,0 +1,27 @@
+import json
+
+# Creating JSON from Python objects
+data = {
+    'name': 'Alice',
+    'age': 25,
+    'city': 'New York',
+    'hobbies': ['reading', 'swimming', 'coding']
+}
+
+# Convert to JSON string
+json_string = json.dumps(data, indent=2)
+print('JSON string:')
+print(json_string)
+
+# Parse JSON string back to Python object
+parsed_data = json.loads(json_string)
+print(f'\nParsed data: {parsed_data}')
+print(f'Name: {parsed_data["name"]}')
+
+# Working with JSON files
+with open('data.json', 'w') as f:
+    json.dump(data, f, indent=2)
+
+with open('data.json', 'r') as f:
+    loaded_data = json.load(f)
+print(f'\nLoaded from file: {loaded_data}')
@@ -0,0 +1,28 @@
+# Custom context manager
+class Timer:
+    def __init__(self, name):
+        self.name = name
+    
+    def __enter__(self):
+        import time
+        self.start = time.time()
+        print(f'Starting {self.name}...')
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        import time
+        self.end = time.time()
+        print(f'{self.name} took {self.end - self.start:.4f} seconds')
+
+# Using the context manager
+with Timer('calculation'):
+    result = sum(i**2 for i in range(1000))
+    print(f'Result: {result}')
+
+# File context manager (built-in)
+with open('test.txt', 'w') as f:
+    f.write('Hello, context manager!')
+
+with open('test.txt', 'r') as f:
+    content = f.read()
+    print(f'File content: {content}')
@@ -0,0 +1,35 @@
+class Animal:
+    def __init__(self, name):
+        self.name = name
+    
+    def speak(self):
+        pass
+    
+    def describe(self):
+        return f'{self.name} is an animal'
+
+class Dog(Animal):
+    def speak(self):
+        return f'{self.name} says Woof!'
+    
+    def fetch(self):
+        return f'{self.name} fetches the ball'
+
+class Cat(Animal):
+    def speak(self):
+        return f'{self.name} says Meow!'
+    
+    def climb(self):
+        return f'{self.name} climbs the tree'
+
+# Using inheritance and polymorphism
+animals = [Dog('Buddy'), Cat('Whiskers'), Animal('Generic')]
+
+for animal in animals:
+    print(animal.describe())
+    print(animal.speak())
+    if isinstance(animal, Dog):
+        print(animal.fetch())
+    elif isinstance(animal, Cat):
+        print(animal.climb())
+    print()
@@ -0,0 +1,36 @@
+class LoggedMeta(type):
+    def __new__(cls, name, bases, attrs):
+        print(f'Creating class: {name}')
+        return super().__new__(cls, name, bases, attrs)
+    
+    def __init__(cls, name, bases, attrs):
+        print(f'Initializing class: {name}')
+        super().__init__(name, bases, attrs)
+
+class SingletonMeta(type):
+    _instances = {}
+    
+    def __call__(cls, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super().__call__(*args, **kwargs)
+        return cls._instances[cls]
+
+# Using the logging metaclass
+class MyClass(metaclass=LoggedMeta):
+    def __init__(self):
+        print('MyClass instance created')
+
+# Using the singleton metaclass
+class Database(metaclass=SingletonMeta):
+    def __init__(self):
+        self.connection = 'Connected to database'
+    
+    def query(self, sql):
+        return f'Executing: {sql}'
+
+# Testing singleton behavior
+db1 = Database()
+db2 = Database()
+print(f'db1 is db2: {db1 is db2}')
+print(f'db1 connection: {db1.connection}')
+print(f'db2 connection: {db2.connection}')
@@ -0,0 +1,50 @@
+import threading
+import time
+from queue import Queue
+
+# Simple thread function
+def worker(name, delay):
+    print(f'Thread {name} starting')
+    time.sleep(delay)
+    print(f'Thread {name} finished')
+
+# Creating and starting threads
+thread1 = threading.Thread(target=worker, args=('A', 2))
+thread2 = threading.Thread(target=worker, args=('B', 1))
+
+thread1.start()
+thread2.start()
+
+# Waiting for threads to complete
+thread1.join()
+thread2.join()
+print('All threads completed')
+
+# Thread-safe counter
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+    
+    def increment(self):
+        with self.lock:
+            current = self.value
+            time.sleep(0.1)  # Simulate work
+            self.value = current + 1
+    
+    def get_value(self):
+        return self.value
+
+# Testing thread-safe counter
+counter = Counter()
+threads = []
+
+for i in range(5):
+    thread = threading.Thread(target=counter.increment)
+    threads.append(thread)
+    thread.start()
+
+for thread in threads:
+    thread.join()
+
+print(f'Final counter value: {counter.get_value()}')
@@ -0,0 +1,38 @@
+import asyncio
+import aiohttp
+import time
+
+async def fetch_data(session, url, delay):
+    print(f'Starting request to {url}')
+    await asyncio.sleep(delay)  # Simulate network delay
+    print(f'Completed request to {url}')
+    return f'Data from {url}'
+
+async def main():
+    urls = [
+        ('http://api1.com', 1),
+        ('http://api2.com', 2),
+        ('http://api3.com', 1.5)
+    ]
+    
+    async with aiohttp.ClientSession() as session:
+        tasks = [fetch_data(session, url, delay) for url, delay in urls]
+        results = await asyncio.gather(*tasks)
+        
+        for result in results:
+            print(f'Result: {result}')
+
+# Running the async function
+asyncio.run(main())
+
+# Async generator
+async def number_generator(n):
+    for i in range(n):
+        await asyncio.sleep(0.1)
+        yield i
+
+async def consume_generator():
+    async for num in number_generator(5):
+        print(f'Generated: {num}')
+
+asyncio.run(consume_generator())
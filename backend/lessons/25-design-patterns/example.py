@@ -0,0 +1,64 @@
+# Singleton Pattern
+class Singleton:
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+# Factory Pattern
+class AnimalFactory:
+    @staticmethod
+    def create_animal(animal_type, name):
+        if animal_type == 'dog':
+            return Dog(name)
+        elif animal_type == 'cat':
+            return Cat(name)
+        else:
+            raise ValueError(f'Unknown animal type: {animal_type}')
+
+# Observer Pattern
+class Subject:
+    def __init__(self):
+        self._observers = []
+        self._state = None
+    
+    def attach(self, observer):
+        self._observers.append(observer)
+    
+    def notify(self):
+        for observer in self._observers:
+            observer.update(self._state)
+    
+    def set_state(self, state):
+        self._state = state
+        self.notify()
+
+class Observer:
+    def __init__(self, name):
+        self.name = name
+    
+    def update(self, state):
+        print(f'{self.name} received state: {state}')
+
+# Testing patterns
+# Singleton
+singleton1 = Singleton()
+singleton2 = Singleton()
+print(f'Singleton test: {singleton1 is singleton2}')
+
+# Factory
+factory = AnimalFactory()
+dog = factory.create_animal('dog', 'Rex')
+cat = factory.create_animal('cat', 'Fluffy')
+print(f'Created: {dog.speak()}')
+print(f'Created: {cat.speak()}')
+
+# Observer
+subject = Subject()
+observer1 = Observer('Observer1')
+observer2 = Observer('Observer2')
+subject.attach(observer1)
+subject.attach(observer2)
+subject.set_state('New state')
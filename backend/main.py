@@ -1,17 +1,86 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Mapping, Optional, Union
+from contextlib import asynccontextmanager, closing, suppress
+import asyncio
 import jwt
 from datetime import datetime, timedelta
 import os
-import subprocess
-import tempfile
+import sys
 import json
+import threading
+import time
+
+from execution import ExecutionScheduler, QueueFullError, WorkerPool, WorkerError, interpreter_version
+from result_cache import ResultCache
+from preflight import check_code
+from sqlalchemy.exc import IntegrityError
+from database import LessonStore, ProgressStore, UserStore, hour_bucket, migrate
+from lesson_catalog import LessonCatalog
+from lesson_library import LessonLibrary
+from lesson_search import LessonSearchIndex
+import grading
+import metrics
+from metrics import REGISTRY, MetricsMiddleware
+
+# Code execution
+EXECUTION_TIMEOUT_SECONDS = 10
+EXECUTION_MAX_OUTPUT_BYTES = int(os.getenv("EXECUTION_MAX_OUTPUT_BYTES", "65536"))
+EXECUTION_LIMITS = {
+    "cpu_seconds": int(os.getenv("EXECUTION_CPU_LIMIT_SECONDS", "5")),
+    "memory_bytes": int(os.getenv("EXECUTION_MEMORY_LIMIT_MB", "512")) * 1024 * 1024,
+    # RLIMIT_NPROC counts every process and thread of the server's user,
+    # the API's own included, so it is off (0) unless jobs get their own uid
+    "processes": int(os.getenv("EXECUTION_MAX_PROCESSES", "0")),
+}
+EXECUTION_POOL_SIZE = int(os.getenv("EXECUTION_POOL_SIZE", "4"))
+EXECUTION_MAX_JOBS_PER_WORKER = int(os.getenv("EXECUTION_MAX_JOBS_PER_WORKER", "100"))
+EXECUTION_MAX_CONCURRENCY = int(os.getenv("EXECUTION_MAX_CONCURRENCY", str(os.cpu_count() or 1)))
+EXECUTION_MAX_QUEUE = int(os.getenv("EXECUTION_MAX_QUEUE", "32"))
+EXECUTION_CACHE_SIZE = int(os.getenv("EXECUTION_CACHE_SIZE", "1024"))
+EXECUTION_CACHE_TTL_SECONDS = int(os.getenv("EXECUTION_CACHE_TTL_SECONDS", "3600"))
+EXECUTION_PREFLIGHT_CACHE_SIZE = int(os.getenv("EXECUTION_PREFLIGHT_CACHE_SIZE", "4096"))
+# Comma-separated top-level modules snippets may not import, e.g. "ctypes,socket"
+EXECUTION_FORBIDDEN_MODULES = frozenset(
+    name.strip() for name in os.getenv("EXECUTION_FORBIDDEN_MODULES", "").split(",") if name.strip()
+)
+EXECUTION_BATCH_MAX_SIZE = int(os.getenv("EXECUTION_BATCH_MAX_SIZE", "100"))
+EXECUTION_BATCH_CONCURRENCY = int(os.getenv("EXECUTION_BATCH_CONCURRENCY", "4"))
+
+# Lessons
+LESSONS_DIR = os.getenv("LESSONS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lessons"))
+LESSON_RELOAD_INTERVAL_SECONDS = float(os.getenv("LESSON_RELOAD_INTERVAL_SECONDS", "2"))
+# Hours of completion history /stats reports
+STATS_RECENT_HOURS = int(os.getenv("STATS_RECENT_HOURS", "24"))
+# Records per /progress/batch call; each one binds a handful of statement
+# parameters, and PostgreSQL takes at most 65535 per statement
+PROGRESS_BATCH_MAX_SIZE = int(os.getenv("PROGRESS_BATCH_MAX_SIZE", "1000"))
+
+worker_pool = WorkerPool(EXECUTION_POOL_SIZE, EXECUTION_MAX_JOBS_PER_WORKER)
+execution_scheduler = ExecutionScheduler(EXECUTION_MAX_CONCURRENCY, EXECUTION_MAX_QUEUE)
+result_cache = ResultCache(EXECUTION_CACHE_SIZE, EXECUTION_CACHE_TTL_SECONDS)
+# Compile errors only depend on the source, so they can be kept for long
+preflight_cache = ResultCache(EXECUTION_PREFLIGHT_CACHE_SIZE, 24 * 3600, only_deterministic=False)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    worker_pool.start()
+    result_cache.namespace = interpreter_version()
+    # Warm the cache in the background so startup isn't held up by slow
+    # examples; kept on app.state for whoever needs to wait for it
+    prewarm = app.state.prewarm = asyncio.create_task(prewarm_result_cache())
+    stop_watching = threading.Event()
+    threading.Thread(target=watch_lessons, args=(stop_watching,), name="lesson-watcher", daemon=True).start()
+    yield
+    prewarm.cancel()
+    stop_watching.set()
+    worker_pool.close()
 
 # Initialize FastAPI app
-app = FastAPI(title="LearnPython API", version="1.0.0")
+app = FastAPI(title="LearnPython API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -21,11 +90,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Security
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
 security = HTTPBearer()
 
@@ -42,6 +113,15 @@ class UserCreate(BaseModel):
     password: str
     full_name: Optional[str] = None
 
+class LessonTestCase(BaseModel):
+    name: Optional[str] = None
+    # Either run the code with stdin and compare what it prints...
+    stdin: Optional[str] = None
+    expected_stdout: Optional[str] = None
+    # ...or evaluate a call against it; both are Python expressions
+    call: Optional[str] = None
+    expected: Optional[str] = None
+
 class Lesson(BaseModel):
     id: int
     title: str
@@ -50,6 +130,22 @@ class Lesson(BaseModel):
     code_example: str
     difficulty: str
     category: str
+    test_cases: List[LessonTestCase] = []
+
+class LessonSummary(BaseModel):
+    id: int
+    title: str
+    description: str
+    difficulty: str
+    category: str
+
+class LessonSearchResult(LessonSummary):
+    score: float
+
+class LessonSearchResponse(BaseModel):
+    total: int
+    offset: int
+    results: List[LessonSearchResult]
 
 class UserProgress(BaseModel):
     user_id: int
@@ -57,6 +153,33 @@ class UserProgress(BaseModel):
     completed: bool
     completed_at: Optional[datetime] = None
 
+class CompletionCounts(BaseModel):
+    # Progress records, and how many of those are completed
+    started: int
+    completed: int
+    completion_rate: float
+
+class LessonStats(CompletionCounts):
+    lesson_id: int
+    title: str
+
+class CompletionBucket(BaseModel):
+    hour: str
+    completions: int
+
+class ProgressStats(BaseModel):
+    total: CompletionCounts
+    lessons: List[LessonStats]
+    categories: Dict[str, CompletionCounts]
+    difficulties: Dict[str, CompletionCounts]
+    # Completions per UTC hour, oldest first
+    recent_completions: List[CompletionBucket]
+
+class UserStats(CompletionCounts):
+    user_id: int
+    # Share of the whole catalog the user has completed
+    catalog_completion_rate: float
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -66,243 +189,112 @@ class TokenData(BaseModel):
 
 class CodeExecutionRequest(BaseModel):
     code: str
+    # Simulate the clock so sleeps (time.sleep, asyncio.sleep) return instantly
+    virtual_clock: bool = False
 
 class CodeExecutionResponse(BaseModel):
     output: str
     error: str
     success: bool
+    # Output went past EXECUTION_MAX_OUTPUT_BYTES and was cut short
+    truncated: bool = False
+    # Resource usage; missing when the sandbox itself failed
+    wall_time_ms: Optional[float] = None
+    cpu_time_ms: Optional[float] = None
+    peak_rss_kb: Optional[int] = None
+    # ok, error, timeout, cpu_limit, memory_limit, crash or sandbox_error
+    exit_reason: Optional[str] = None
 
-# Mock database (in real app, this would be PostgreSQL)
-users_db = {}
-lessons_db = {
-    1: {
-        "id": 1,
-        "title": "Hello World",
-        "description": "Learn how to print text in Python",
-        "content": "The print() function is used to output text to the console. It's one of the most basic and commonly used functions in Python. You can print strings, numbers, and even the results of calculations.",
-        "code_example": "print('Hello, World!')\nprint('Welcome to Python!')\nprint(2 + 3)\nprint('The result is:', 5)",
-        "difficulty": "beginner",
-        "category": "basics"
-    },
-    2: {
-        "id": 2,
-        "title": "Variables and Data Types",
-        "description": "Understanding variables and basic data types in Python",
-        "content": "Variables are containers for storing data values. Python has several built-in data types including strings, integers, floats, and booleans. Variables are created when you assign a value to them.",
-        "code_example": "name = 'Alice'\nage = 25\nheight = 5.6\nis_student = True\n\nprint(f'Name: {name}')\nprint(f'Age: {age}')\nprint(f'Height: {height}')\nprint(f'Student: {is_student}')",
-        "difficulty": "beginner",
-        "category": "basics"
-    },
-    3: {
-        "id": 3,
-        "title": "Basic Math Operations",
-        "description": "Performing mathematical calculations in Python",
-        "content": "Python can perform all basic mathematical operations. You can use +, -, *, / for addition, subtraction, multiplication, and division. Python also supports more advanced operations like exponentiation (**) and modulo (%).",
-        "code_example": "# Basic arithmetic\nx = 10\ny = 3\n\naddition = x + y\nsubtraction = x - y\nmultiplication = x * y\ndivision = x / y\nmodulo = x % y\nexponent = x ** y\n\nprint(f'Addition: {addition}')\nprint(f'Subtraction: {subtraction}')\nprint(f'Multiplication: {multiplication}')\nprint(f'Division: {division}')\nprint(f'Modulo: {modulo}')\nprint(f'Exponent: {exponent}')",
-        "difficulty": "beginner",
-        "category": "basics"
-    },
-    4: {
-        "id": 4,
-        "title": "String Operations",
-        "description": "Working with text and string manipulation",
-        "content": "Strings are sequences of characters. Python provides many built-in methods for string manipulation including concatenation, slicing, formatting, and various string methods.",
-        "code_example": "text = 'Hello, Python!'\n\n# String length\nprint(f'Length: {len(text)}')\n\n# String slicing\nprint(f'First 5 characters: {text[:5]}')\nprint(f'Last 6 characters: {text[-6:]}')\n\n# String methods\nprint(f'Uppercase: {text.upper()}')\nprint(f'Lowercase: {text.lower()}')\nprint(f'Title case: {text.title()}')\n\n# String concatenation\nfirst = 'Hello'\nsecond = 'World'\nresult = first + ' ' + second\nprint(f'Concatenated: {result}')",
-        "difficulty": "beginner",
-        "category": "basics"
-    },
-    5: {
-        "id": 5,
-        "title": "Lists and Loops",
-        "description": "Working with lists and for loops",
-        "content": "Lists are ordered collections of items. For loops allow you to iterate over sequences like lists. List comprehension is a concise way to create lists based on existing sequences.",
-        "code_example": "fruits = ['apple', 'banana', 'orange']\n\n# Iterating through a list\nfor fruit in fruits:\n    print(f'I like {fruit}')\n\n# List comprehension\nsquares = [x**2 for x in range(5)]\nprint(squares)\n\n# Adding items to a list\nfruits.append('grape')\nprint(fruits)\n\n# List methods\nnumbers = [3, 1, 4, 1, 5, 9, 2, 6]\nprint(f'Original: {numbers}')\nprint(f'Sorted: {sorted(numbers)}')\nprint(f'Sum: {sum(numbers)}')\nprint(f'Max: {max(numbers)}')",
-        "difficulty": "beginner",
-        "category": "data structures"
-    },
-    6: {
-        "id": 6,
-        "title": "Conditional Statements",
-        "description": "Using if, elif, and else statements",
-        "content": "Conditional statements allow your program to make decisions based on certain conditions. You can use if, elif (else if), and else to control the flow of your program.",
-        "code_example": "age = 18\ntemperature = 25\n\n# Simple if statement\nif age >= 18:\n    print('You are an adult')\nelse:\n    print('You are a minor')\n\n# Multiple conditions\nif temperature < 0:\n    print('It is freezing')\nelif temperature < 20:\n    print('It is cold')\nelif temperature < 30:\n    print('It is warm')\nelse:\n    print('It is hot')\n\n# Complex conditions\nscore = 85\nif score >= 90:\n    grade = 'A'\nelif score >= 80:\n    grade = 'B'\nelif score >= 70:\n    grade = 'C'\nelse:\n    grade = 'F'\nprint(f'Grade: {grade}')",
-        "difficulty": "beginner",
-        "category": "basics"
-    },
-    7: {
-        "id": 7,
-        "title": "Dictionaries",
-        "description": "Working with key-value pairs in dictionaries",
-        "content": "Dictionaries store data as key-value pairs. They are unordered, changeable, and indexed. Dictionaries are perfect for storing related information together.",
-        "code_example": "student = {\n    'name': 'Alice',\n    'age': 20,\n    'grades': [85, 90, 92]\n}\n\nprint(f'Student: {student[\"name\"]}')\nprint(f'Age: {student[\"age\"]}')\nprint(f'Average grade: {sum(student[\"grades\"]) / len(student[\"grades\"])}')\n\n# Adding new key-value pairs\nstudent['major'] = 'Computer Science'\nprint(student)\n\n# Dictionary methods\nprint(f'Keys: {list(student.keys())}')\nprint(f'Values: {list(student.values())}')\nprint(f'Items: {list(student.items())}')",
-        "difficulty": "intermediate",
-        "category": "data structures"
-    },
-    8: {
-        "id": 8,
-        "title": "Functions",
-        "description": "Creating and using functions in Python",
-        "content": "Functions are reusable blocks of code that perform specific tasks. They help organize code and avoid repetition. Functions can take parameters and return values.",
-        "code_example": "def greet(name):\n    return f'Hello, {name}!'\n\ndef add_numbers(a, b):\n    return a + b\n\ndef calculate_area(length, width):\n    area = length * width\n    return area\n\n# Using the functions\nmessage = greet('Alice')\nresult = add_numbers(5, 3)\nrectangle_area = calculate_area(10, 5)\n\nprint(message)\nprint(f'5 + 3 = {result}')\nprint(f'Rectangle area: {rectangle_area}')",
-        "difficulty": "intermediate",
-        "category": "functions"
-    },
-    9: {
-        "id": 9,
-        "title": "List Comprehensions",
-        "description": "Advanced list creation and manipulation",
-        "content": "List comprehensions provide a concise way to create lists based on existing sequences. They are more readable and often faster than traditional for loops.",
-        "code_example": "# Basic list comprehension\nsquares = [x**2 for x in range(10)]\nprint(f'Squares: {squares}')\n\n# List comprehension with condition\neven_squares = [x**2 for x in range(10) if x % 2 == 0]\nprint(f'Even squares: {even_squares}')\n\n# Nested list comprehension\nmatrix = [[i+j for j in range(3)] for i in range(3)]\nprint(f'Matrix: {matrix}')\n\n# Dictionary comprehension\nword_lengths = {word: len(word) for word in ['apple', 'banana', 'cherry']}\nprint(f'Word lengths: {word_lengths}')\n\n# Set comprehension\nunique_squares = {x**2 for x in range(10)}\nprint(f'Unique squares: {unique_squares}')",
-        "difficulty": "intermediate",
-        "category": "data structures"
-    },
-    10: {
-        "id": 10,
-        "title": "Error Handling",
-        "description": "Using try-except blocks to handle errors",
-        "content": "Error handling allows your program to gracefully handle unexpected situations. Try-except blocks catch exceptions and prevent your program from crashing.",
-        "code_example": "def divide_numbers(a, b):\n    try:\n        result = a / b\n        return result\n    except ZeroDivisionError:\n        return 'Error: Cannot divide by zero'\n    except TypeError:\n        return 'Error: Please provide numbers'\n\n# Testing the function\nprint(divide_numbers(10, 2))\nprint(divide_numbers(10, 0))\nprint(divide_numbers('10', 2))\n\n# Using try-except with file operations\ntry:\n    with open('nonexistent.txt', 'r') as file:\n        content = file.read()\nexcept FileNotFoundError:\n    print('File not found!')\n\n# Custom exceptions\ntry:\n    age = int(input('Enter age: '))\n    if age < 0:\n        raise ValueError('Age cannot be negative')\nexcept ValueError as e:\n    print(f'Invalid input: {e}')",
-        "difficulty": "intermediate",
-        "category": "functions"
-    },
-    11: {
-        "id": 11,
-        "title": "File Handling",
-        "description": "Reading and writing files in Python",
-        "content": "Python provides built-in functions for file operations. You can read from files, write to files, and handle different file formats. Always remember to close files after use.",
-        "code_example": "# Writing to a file\nwith open('example.txt', 'w') as file:\n    file.write('Hello, this is a test file!\\n')\n    file.write('This is the second line.')\n\n# Reading from a file\nwith open('example.txt', 'r') as file:\n    content = file.read()\n    print('File content:')\n    print(content)\n\n# Reading line by line\nwith open('example.txt', 'r') as file:\n    for line in file:\n        print(f'Line: {line.strip()}')\n\n# Working with CSV-like data\ndata = [['Name', 'Age'], ['Alice', '25'], ['Bob', '30']]\nwith open('data.csv', 'w') as file:\n    for row in data:\n        file.write(','.join(row) + '\\n')",
-        "difficulty": "intermediate",
-        "category": "modules & libraries"
-    },
-    12: {
-        "id": 12,
-        "title": "Classes and Objects",
-        "description": "Introduction to Object-Oriented Programming",
-        "content": "Classes are blueprints for creating objects. They encapsulate data and behavior. Object-oriented programming helps organize code and makes it more maintainable.",
-        "code_example": "class Student:\n    def __init__(self, name, age):\n        self.name = name\n        self.age = age\n        self.grades = []\n    \n    def add_grade(self, grade):\n        self.grades.append(grade)\n    \n    def get_average(self):\n        if not self.grades:\n            return 0\n        return sum(self.grades) / len(self.grades)\n    \n    def __str__(self):\n        return f'Student: {self.name}, Age: {self.age}'\n\n# Creating objects\nstudent1 = Student('Alice', 20)\nstudent1.add_grade(85)\nstudent1.add_grade(90)\n\nprint(student1)\nprint(f'{student1.name} average: {student1.get_average()}')",
-        "difficulty": "advanced",
-        "category": "object-oriented programming"
-    },
-    13: {
-        "id": 13,
-        "title": "Recursion",
-        "description": "Understanding recursive functions",
-        "content": "Recursion is when a function calls itself. It's a powerful programming technique that can solve complex problems by breaking them down into smaller, similar subproblems.",
-        "code_example": "def factorial(n):\n    if n <= 1:\n        return 1\n    return n * factorial(n - 1)\n\ndef fibonacci(n):\n    if n <= 1:\n        return n\n    return fibonacci(n - 1) + fibonacci(n - 2)\n\ndef count_down(n):\n    if n <= 0:\n        print('Blast off!')\n        return\n    print(n)\n    count_down(n - 1)\n\n# Testing recursive functions\nprint(f'Factorial of 5: {factorial(5)}')\nprint(f'Fibonacci of 7: {fibonacci(7)}')\ncount_down(5)",
-        "difficulty": "advanced",
-        "category": "functions"
-    },
-    14: {
-        "id": 14,
-        "title": "Decorators",
-        "description": "Using function decorators for code enhancement",
-        "content": "Decorators are functions that modify the behavior of other functions. They provide a way to add functionality to existing functions without modifying their code.",
-        "code_example": "import time\n\ndef timer(func):\n    def wrapper(*args, **kwargs):\n        start = time.time()\n        result = func(*args, **kwargs)\n        end = time.time()\n        print(f'{func.__name__} took {end - start:.4f} seconds')\n        return result\n    return wrapper\n\ndef cache(func):\n    memo = {}\n    def wrapper(*args):\n        if args not in memo:\n            memo[args] = func(*args)\n        return memo[args]\n    return wrapper\n\n@timer\n@cache\ndef fibonacci(n):\n    if n <= 1:\n        return n\n    return fibonacci(n - 1) + fibonacci(n - 2)\n\nprint(fibonacci(10))",
-        "difficulty": "advanced",
-        "category": "functions"
-    },
-    15: {
-        "id": 15,
-        "title": "Generators",
-        "description": "Creating memory-efficient iterators with generators",
-        "content": "Generators are functions that return an iterator. They use the 'yield' keyword and are memory efficient for large datasets since they generate values on-demand.",
-        "code_example": "def number_generator(n):\n    for i in range(n):\n        yield i\n\ndef fibonacci_generator():\n    a, b = 0, 1\n    while True:\n        yield a\n        a, b = b, a + b\n\ndef even_numbers_generator(n):\n    for i in range(n):\n        if i % 2 == 0:\n            yield i\n\n# Using generators\nprint('Number generator:')\nfor num in number_generator(5):\n    print(num, end=' ')\nprint()\n\nprint('First 10 Fibonacci numbers:')\nfib = fibonacci_generator()\nfor _ in range(10):\n    print(next(fib), end=' ')\nprint()\n\nprint('Even numbers:')\nfor even in even_numbers_generator(10):\n    print(even, end=' ')\nprint()",
-        "difficulty": "advanced",
-        "category": "functions"
-    },
-    16: {
-        "id": 16,
-        "title": "Data Structures Challenge",
-        "description": "Advanced problem solving with data structures",
-        "content": "This challenge combines multiple data structures to solve complex problems. You'll work with lists, dictionaries, sets, and custom data structures to implement efficient algorithms.",
-        "code_example": "# Implementing a simple cache system\nclass Cache:\n    def __init__(self, max_size=3):\n        self.max_size = max_size\n        self.cache = {}\n        self.access_order = []\n    \n    def get(self, key):\n        if key in self.cache:\n            # Move to end (most recently used)\n            self.access_order.remove(key)\n            self.access_order.append(key)\n            return self.cache[key]\n        return None\n    \n    def put(self, key, value):\n        if key in self.cache:\n            self.access_order.remove(key)\n        elif len(self.cache) >= self.max_size:\n            # Remove least recently used\n            lru_key = self.access_order.pop(0)\n            del self.cache[lru_key]\n        \n        self.cache[key] = value\n        self.access_order.append(key)\n\n# Testing the cache\ncache = Cache(3)\ncache.put('A', 1)\ncache.put('B', 2)\ncache.put('C', 3)\nprint(f'Cache: {cache.cache}')\nprint(f'Get A: {cache.get(\"A\")}')\ncache.put('D', 4)\nprint(f'Cache after adding D: {cache.cache}')",
-        "difficulty": "advanced",
-        "category": "data structures"
-    },
-    17: {
-        "id": 17,
-        "title": "Lambda Functions",
-        "description": "Creating anonymous functions with lambda expressions",
-        "content": "Lambda functions are small anonymous functions that can have any number of arguments but only one expression. They are useful for simple operations and can be used with higher-order functions like map, filter, and reduce.",
-        "code_example": "# Basic lambda function\nsquare = lambda x: x**2\nprint(f'Square of 5: {square(5)}')\n\n# Lambda with multiple arguments\nadd = lambda x, y: x + y\nprint(f'Sum of 3 and 7: {add(3, 7)}')\n\n# Using lambda with map\nnumbers = [1, 2, 3, 4, 5]\nsquared = list(map(lambda x: x**2, numbers))\nprint(f'Squared numbers: {squared}')\n\n# Using lambda with filter\neven_numbers = list(filter(lambda x: x % 2 == 0, numbers))\nprint(f'Even numbers: {even_numbers}')\n\n# Lambda with conditional expression\ncheck_grade = lambda score: 'Pass' if score >= 60 else 'Fail'\nprint(f'Score 75: {check_grade(75)}')\nprint(f'Score 45: {check_grade(45)}')",
-        "difficulty": "intermediate",
-        "category": "functions"
-    },
-    18: {
-        "id": 18,
-        "title": "Regular Expressions",
-        "description": "Pattern matching and text processing with regex",
-        "content": "Regular expressions are powerful tools for pattern matching and text manipulation. They allow you to search, extract, and replace text based on complex patterns.",
-        "code_example": "import re\n\n# Basic pattern matching\ntext = 'My phone number is 123-456-7890'\nphone_pattern = r'\\d{3}-\\d{3}-\\d{4}'\nmatch = re.search(phone_pattern, text)\nif match:\n    print(f'Found phone: {match.group()}')\n\n# Finding all matches\nemails = 'Contact us at john@example.com or jane@test.org'\nemail_pattern = r'\\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Z|a-z]{2,}\\b'\nfound_emails = re.findall(email_pattern, emails)\nprint(f'Found emails: {found_emails}')\n\n# Replacing text\nsentence = 'The color is red, the sky is blue, the grass is green'\ncolor_pattern = r'\\b(red|blue|green)\\b'\nreplaced = re.sub(color_pattern, 'COLOR', sentence)\nprint(f'Replaced: {replaced}')\n\n# Splitting text\ncsv_data = 'apple,banana,cherry,date'\nsplit_data = re.split(r',', csv_data)\nprint(f'Split data: {split_data}')",
-        "difficulty": "intermediate",
-        "category": "modules & libraries"
-    },
-    19: {
-        "id": 19,
-        "title": "Working with JSON",
-        "description": "Parsing and creating JSON data",
-        "content": "JSON (JavaScript Object Notation) is a lightweight data interchange format. Python provides built-in support for working with JSON through the json module.",
-        "code_example": "import json\n\n# Creating JSON from Python objects\ndata = {\n    'name': 'Alice',\n    'age': 25,\n    'city': 'New York',\n    'hobbies': ['reading', 'swimming', 'coding']\n}\n\n# Convert to JSON string\njson_string = json.dumps(data, indent=2)\nprint('JSON string:')\nprint(json_string)\n\n# Parse JSON string back to Python object\nparsed_data = json.loads(json_string)\nprint(f'\\nParsed data: {parsed_data}')\nprint(f'Name: {parsed_data[\"name\"]}')\n\n# Working with JSON files\nwith open('data.json', 'w') as f:\n    json.dump(data, f, indent=2)\n\nwith open('data.json', 'r') as f:\n    loaded_data = json.load(f)\nprint(f'\\nLoaded from file: {loaded_data}')",
-        "difficulty": "intermediate",
-        "category": "modules & libraries"
-    },
-    20: {
-        "id": 20,
-        "title": "Context Managers",
-        "description": "Using with statements for resource management",
-        "content": "Context managers provide a way to properly manage resources like files, network connections, and database connections. They ensure that resources are properly cleaned up even if exceptions occur.",
-        "code_example": "# Custom context manager\nclass Timer:\n    def __init__(self, name):\n        self.name = name\n    \n    def __enter__(self):\n        import time\n        self.start = time.time()\n        print(f'Starting {self.name}...')\n        return self\n    \n    def __exit__(self, exc_type, exc_val, exc_tb):\n        import time\n        self.end = time.time()\n        print(f'{self.name} took {self.end - self.start:.4f} seconds')\n\n# Using the context manager\nwith Timer('calculation'):\n    result = sum(i**2 for i in range(1000))\n    print(f'Result: {result}')\n\n# File context manager (built-in)\nwith open('test.txt', 'w') as f:\n    f.write('Hello, context manager!')\n\nwith open('test.txt', 'r') as f:\n    content = f.read()\n    print(f'File content: {content}')",
-        "difficulty": "intermediate",
-        "category": "functions"
-    },
-    21: {
-        "id": 21,
-        "title": "Inheritance and Polymorphism",
-        "description": "Advanced object-oriented programming concepts",
-        "content": "Inheritance allows a class to inherit attributes and methods from another class. Polymorphism enables objects of different classes to be treated as objects of a common superclass.",
-        "code_example": "class Animal:\n    def __init__(self, name):\n        self.name = name\n    \n    def speak(self):\n        pass\n    \n    def describe(self):\n        return f'{self.name} is an animal'\n\nclass Dog(Animal):\n    def speak(self):\n        return f'{self.name} says Woof!'\n    \n    def fetch(self):\n        return f'{self.name} fetches the ball'\n\nclass Cat(Animal):\n    def speak(self):\n        return f'{self.name} says Meow!'\n    \n    def climb(self):\n        return f'{self.name} climbs the tree'\n\n# Using inheritance and polymorphism\nanimals = [Dog('Buddy'), Cat('Whiskers'), Animal('Generic')]\n\nfor animal in animals:\n    print(animal.describe())\n    print(animal.speak())\n    if isinstance(animal, Dog):\n        print(animal.fetch())\n    elif isinstance(animal, Cat):\n        print(animal.climb())\n    print()",
-        "difficulty": "advanced",
-        "category": "object-oriented programming"
-    },
-    22: {
-        "id": 22,
-        "title": "Metaclasses",
-        "description": "Understanding class creation and metaclasses",
-        "content": "Metaclasses are classes for classes. They control how classes are created and can be used to add functionality to all classes of a certain type. This is an advanced concept that demonstrates Python's flexibility.",
-        "code_example": "class LoggedMeta(type):\n    def __new__(cls, name, bases, attrs):\n        print(f'Creating class: {name}')\n        return super().__new__(cls, name, bases, attrs)\n    \n    def __init__(cls, name, bases, attrs):\n        print(f'Initializing class: {name}')\n        super().__init__(name, bases, attrs)\n\nclass SingletonMeta(type):\n    _instances = {}\n    \n    def __call__(cls, *args, **kwargs):\n        if cls not in cls._instances:\n            cls._instances[cls] = super().__call__(*args, **kwargs)\n        return cls._instances[cls]\n\n# Using the logging metaclass\nclass MyClass(metaclass=LoggedMeta):\n    def __init__(self):\n        print('MyClass instance created')\n\n# Using the singleton metaclass\nclass Database(metaclass=SingletonMeta):\n    def __init__(self):\n        self.connection = 'Connected to database'\n    \n    def query(self, sql):\n        return f'Executing: {sql}'\n\n# Testing singleton behavior\ndb1 = Database()\ndb2 = Database()\nprint(f'db1 is db2: {db1 is db2}')\nprint(f'db1 connection: {db1.connection}')\nprint(f'db2 connection: {db2.connection}')",
-        "difficulty": "advanced",
-        "category": "object-oriented programming"
-    },
-    23: {
-        "id": 23,
-        "title": "Concurrency with Threading",
-        "description": "Running multiple threads for concurrent execution",
-        "content": "Threading allows you to run multiple threads of execution concurrently. This is useful for I/O-bound tasks and can improve performance in certain scenarios.",
-        "code_example": "import threading\nimport time\nfrom queue import Queue\n\n# Simple thread function\ndef worker(name, delay):\n    print(f'Thread {name} starting')\n    time.sleep(delay)\n    print(f'Thread {name} finished')\n\n# Creating and starting threads\nthread1 = threading.Thread(target=worker, args=('A', 2))\nthread2 = threading.Thread(target=worker, args=('B', 1))\n\nthread1.start()\nthread2.start()\n\n# Waiting for threads to complete\nthread1.join()\nthread2.join()\nprint('All threads completed')\n\n# Thread-safe counter\nclass Counter:\n    def __init__(self):\n        self.value = 0\n        self.lock = threading.Lock()\n    \n    def increment(self):\n        with self.lock:\n            current = self.value\n            time.sleep(0.1)  # Simulate work\n            self.value = current + 1\n    \n    def get_value(self):\n        return self.value\n\n# Testing thread-safe counter\ncounter = Counter()\nthreads = []\n\nfor i in range(5):\n    thread = threading.Thread(target=counter.increment)\n    threads.append(thread)\n    thread.start()\n\nfor thread in threads:\n    thread.join()\n\nprint(f'Final counter value: {counter.get_value()}')",
-        "difficulty": "advanced",
-        "category": "modules & libraries"
-    },
-    24: {
-        "id": 24,
-        "title": "Async Programming",
-        "description": "Writing asynchronous code with asyncio",
-        "content": "Asynchronous programming allows you to write concurrent code that can handle many operations simultaneously without using threads. This is particularly useful for I/O-bound applications.",
-        "code_example": "import asyncio\nimport aiohttp\nimport time\n\nasync def fetch_data(session, url, delay):\n    print(f'Starting request to {url}')\n    await asyncio.sleep(delay)  # Simulate network delay\n    print(f'Completed request to {url}')\n    return f'Data from {url}'\n\nasync def main():\n    urls = [\n        ('http://api1.com', 1),\n        ('http://api2.com', 2),\n        ('http://api3.com', 1.5)\n    ]\n    \n    async with aiohttp.ClientSession() as session:\n        tasks = [fetch_data(session, url, delay) for url, delay in urls]\n        results = await asyncio.gather(*tasks)\n        \n        for result in results:\n            print(f'Result: {result}')\n\n# Running the async function\nasyncio.run(main())\n\n# Async generator\nasync def number_generator(n):\n    for i in range(n):\n        await asyncio.sleep(0.1)\n        yield i\n\nasync def consume_generator():\n    async for num in number_generator(5):\n        print(f'Generated: {num}')\n\nasyncio.run(consume_generator())",
-        "difficulty": "advanced",
-        "category": "modules & libraries"
-    },
-    25: {
-        "id": 25,
-        "title": "Design Patterns",
-        "description": "Implementing common software design patterns",
-        "content": "Design patterns are typical solutions to common problems in software design. They provide proven approaches to solving recurring design problems.",
-        "code_example": "# Singleton Pattern\nclass Singleton:\n    _instance = None\n    \n    def __new__(cls):\n        if cls._instance is None:\n            cls._instance = super().__new__(cls)\n        return cls._instance\n\n# Factory Pattern\nclass AnimalFactory:\n    @staticmethod\n    def create_animal(animal_type, name):\n        if animal_type == 'dog':\n            return Dog(name)\n        elif animal_type == 'cat':\n            return Cat(name)\n        else:\n            raise ValueError(f'Unknown animal type: {animal_type}')\n\n# Observer Pattern\nclass Subject:\n    def __init__(self):\n        self._observers = []\n        self._state = None\n    \n    def attach(self, observer):\n        self._observers.append(observer)\n    \n    def notify(self):\n        for observer in self._observers:\n            observer.update(self._state)\n    \n    def set_state(self, state):\n        self._state = state\n        self.notify()\n\nclass Observer:\n    def __init__(self, name):\n        self.name = name\n    \n    def update(self, state):\n        print(f'{self.name} received state: {state}')\n\n# Testing patterns\n# Singleton\nsingleton1 = Singleton()\nsingleton2 = Singleton()\nprint(f'Singleton test: {singleton1 is singleton2}')\n\n# Factory\nfactory = AnimalFactory()\ndog = factory.create_animal('dog', 'Rex')\ncat = factory.create_animal('cat', 'Fluffy')\nprint(f'Created: {dog.speak()}')\nprint(f'Created: {cat.speak()}')\n\n# Observer\nsubject = Subject()\nobserver1 = Observer('Observer1')\nobserver2 = Observer('Observer2')\nsubject.attach(observer1)\nsubject.attach(observer2)\nsubject.set_state('New state')",
-        "difficulty": "advanced",
-        "category": "object-oriented programming"
-    }
-}
+class BatchExecutionItem(CodeExecutionResponse):
+    duration_ms: float
+
+class BatchExecutionResponse(BaseModel):
+    results: List[BatchExecutionItem]
+    duration_ms: float
+
+class TestCaseResult(BaseModel):
+    name: str
+    passed: bool
+    # Missing for cases that never ran
+    duration_ms: Optional[float] = None
+    expected: Optional[str] = None
+    actual: Optional[str] = None
+    # Unified diff of expected against actual, for failing cases
+    diff: Optional[str] = None
+    error: Optional[str] = None
+
+class SubmissionResponse(BaseModel):
+    lesson_id: int
+    passed: bool
+    passed_count: int
+    total: int
+    first_failure: Optional[TestCaseResult] = None
+    results: List[TestCaseResult]
+    # Usage of the one sandbox run that graded every case
+    wall_time_ms: Optional[float] = None
+    cpu_time_ms: Optional[float] = None
+    peak_rss_kb: Optional[int] = None
+    exit_reason: Optional[str] = None
+
+# Database (the schema is migrated before the app starts, see migrate)
+users_db = UserStore()
+lesson_store = LessonStore()
+progress_db = ProgressStore()
 
-progress_db = {}
+# Lessons live in LESSONS_DIR and are read the first time they're needed
+lesson_library = LessonLibrary(LESSONS_DIR)
+lesson_catalog: Optional[LessonCatalog] = None
+lesson_catalog_lock = threading.Lock()
+lesson_search_index = LessonSearchIndex()
+# Catalog the search index was last synced with
+search_index_catalog: Optional[LessonCatalog] = None
+
+def lesson_groups(lessons) -> Dict[int, tuple]:
+    return {lesson["id"]: (lesson["category"], lesson["difficulty"]) for lesson in lessons}
+
+def set_lessons(lessons: List[Mapping]):
+    """Swap in a new lesson catalog; derived views follow it"""
+    global lesson_catalog
+    # The lessons table backs progress foreign keys, so it has to know every id
+    lesson_store.upsert_many(lessons)
+    if lesson_catalog is None:
+        progress_db.ensure_stats()
+    elif lesson_groups(lesson_catalog.lessons.values()) != lesson_groups(lessons):
+        # Completions are counted under each lesson's category and difficulty
+        progress_db.rebuild_stats()
+    # One assignment, so requests see either the old catalog or the new one
+    lesson_catalog = LessonCatalog(lessons)
+
+def get_lesson_catalog() -> LessonCatalog:
+    catalog = lesson_catalog
+    if catalog is None:
+        with lesson_catalog_lock:
+            if lesson_catalog is None:
+                set_lessons(lesson_library.load())
+            catalog = lesson_catalog
+    return catalog
+
+def get_search_index() -> LessonSearchIndex:
+    # Indexing reads every lesson body, so it waits for the first search
+    global search_index_catalog
+    catalog = get_lesson_catalog()
+    if search_index_catalog is not catalog:
+        lesson_search_index.sync(catalog.lessons.values())
+        search_index_catalog = catalog
+    return lesson_search_index
+
+def reload_lessons() -> bool:
+    """Pick up edits to the lesson files; returns whether the catalog changed"""
+    with lesson_catalog_lock:
+        lessons = lesson_library.reload_if_changed()
+        if lessons is None:
+            return False
+        set_lessons(lessons)
+        return True
+
+def watch_lessons(stop: threading.Event):
+    while not stop.wait(LESSON_RELOAD_INTERVAL_SECONDS):
+        reload_lessons()
 
 # JWT Functions
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -315,7 +307,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Verified tokens, each kept no longer than its exp
+token_cache = ResultCache(TOKEN_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES * 60, only_deterministic=False)
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    cached = token_cache.get(credentials.credentials)
+    if cached is not None:
+        return cached
+
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -332,52 +331,184 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Tokens without an expiry are never cached
+    if "exp" in payload:
+        token_cache.put(credentials.credentials, token_data, payload["exp"] - time.time())
     return token_data
 
-def execute_python_code(code: str) -> CodeExecutionResponse:
+def execution_error_message(result: dict) -> str:
+    """Explain runs the snippet's own stderr says nothing about"""
+    if result["timed_out"]:
+        return f"Code execution timed out (max {EXECUTION_TIMEOUT_SECONDS} seconds)"
+    if result["exit_reason"] == "cpu_limit":
+        return f"Code execution exceeded the CPU time limit (max {EXECUTION_LIMITS['cpu_seconds']} seconds)"
+    if result["exit_reason"] == "crash" and not result["stderr"].strip():
+        return f"Code execution crashed (exit status {result['returncode']})"
+    return result["stderr"].strip()
+
+def sandbox_usage(result: dict) -> dict:
+    return {
+        "wall_time_ms": result["wall_time_ms"],
+        "cpu_time_ms": result["cpu_time_ms"],
+        "peak_rss_kb": result["peak_rss_kb"],
+        "exit_reason": result["exit_reason"],
+    }
+
+def execute_python_code(code: str, virtual_clock: bool = False) -> CodeExecutionResponse:
     """Execute Python code safely and return the result"""
     try:
-        # Create a temporary file for the code
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(code)
-            temp_file = f.name
-        
-        # Execute the code with a timeout
-        result = subprocess.run(
-            ['python3', temp_file],
-            capture_output=True,
-            text=True,
-            timeout=10  # 10 second timeout
+        result = worker_pool.run(
+            code, EXECUTION_TIMEOUT_SECONDS, EXECUTION_MAX_OUTPUT_BYTES, EXECUTION_LIMITS, virtual_clock
         )
-        
-        # Clean up the temporary file
-        os.unlink(temp_file)
-        
-        if result.returncode == 0:
-            return CodeExecutionResponse(
-                output=result.stdout.strip(),
-                error="",
-                success=True
-            )
-        else:
-            return CodeExecutionResponse(
-                output="",
-                error=result.stderr.strip(),
-                success=False
-            )
-            
-    except subprocess.TimeoutExpired:
+    except (WorkerError, OSError) as e:
         return CodeExecutionResponse(
             output="",
-            error="Code execution timed out (max 10 seconds)",
-            success=False
+            error=f"Execution error: {str(e)}",
+            success=False,
+            exit_reason="sandbox_error"
         )
-    except Exception as e:
+
+    usage = {"truncated": result["truncated"], **sandbox_usage(result)}
+    if result["returncode"] == 0 and not result["timed_out"]:
+        return CodeExecutionResponse(
+            output=result["stdout"].strip(),
+            error="",
+            success=True,
+            **usage
+        )
+    else:
         return CodeExecutionResponse(
             output="",
-            error=f"Execution error: {str(e)}",
-            success=False
+            error=execution_error_message(result),
+            success=False,
+            **usage
+        )
+
+def grade_python_code(code: str, test_cases: List[dict], virtual_clock: bool = False) -> dict:
+    """Run code against every test case in one sandbox job
+
+    Returns per-case results plus the run's resource usage.
+    """
+    try:
+        result = worker_pool.run(
+            grading.build_program(code, test_cases),
+            EXECUTION_TIMEOUT_SECONDS, EXECUTION_MAX_OUTPUT_BYTES, EXECUTION_LIMITS, virtual_clock,
+            reports=True,
         )
+    except (WorkerError, OSError) as e:
+        return {
+            "results": grading.grade(test_cases, [], f"Execution error: {str(e)}"),
+            "exit_reason": "sandbox_error",
+        }
+
+    failure = None
+    if result["returncode"] != 0 or result["timed_out"]:
+        failure = execution_error_message(result)
+    reported = grading.parse_results(result["reports"])
+    return {
+        "results": grading.grade(test_cases, reported, failure),
+        **sandbox_usage(result),
+        "exit_reason": grading.exit_reason(reported, result["exit_reason"]),
+    }
+
+def stream_python_code(code: str, virtual_clock: bool = False):
+    """Execute Python code, yielding (event, data) pairs as output is produced
+
+    stdout/stderr chunks come first, followed by a single "result" event
+    carrying the final status.
+    """
+    try:
+        for message in worker_pool.stream(
+            code, EXECUTION_TIMEOUT_SECONDS, EXECUTION_MAX_OUTPUT_BYTES, EXECUTION_LIMITS, virtual_clock
+        ):
+            if message["type"] == "chunk":
+                yield message["stream"], message["data"]
+                continue
+            success = message["returncode"] == 0 and not message["timed_out"]
+            # stderr has already been streamed; only add what it can't say
+            error = ""
+            if message["exit_reason"] in ("timeout", "cpu_limit", "crash"):
+                error = execution_error_message(message)
+            yield "result", {
+                "success": success,
+                "returncode": message["returncode"],
+                "error": error,
+                "truncated": message["truncated"],
+                "wall_time_ms": message["wall_time_ms"],
+                "cpu_time_ms": message["cpu_time_ms"],
+                "peak_rss_kb": message["peak_rss_kb"],
+                "exit_reason": message["exit_reason"],
+            }
+    except (WorkerError, OSError) as e:
+        yield "result", {
+            "success": False,
+            "returncode": None,
+            "error": f"Execution error: {str(e)}",
+            "truncated": False,
+            "exit_reason": "sandbox_error",
+        }
+
+def is_cacheable(result: CodeExecutionResponse) -> bool:
+    """Hitting a runtime limit or a sandbox failure says nothing about the code itself"""
+    return result.exit_reason in ("ok", "error")
+
+def preflight_python_code(code: str) -> Optional[CodeExecutionResponse]:
+    """Fail code that can't run without starting a job; None if it may run"""
+    # Compile errors are only faithful when we compile with the same Python
+    if interpreter_version() != sys.version:
+        return None
+
+    error = preflight_cache.get(code)
+    if error is None:
+        error = check_code(code, EXECUTION_FORBIDDEN_MODULES) or ""
+        preflight_cache.put(code, error)
+    if not error:
+        return None
+    metrics.execution_preflight_rejections_total.inc()
+    return CodeExecutionResponse(output="", error=error, success=False, exit_reason="error")
+
+async def run_python_code(code: str, virtual_clock: bool = False):
+    """Serve code from the result cache or run it through the scheduler
+
+    Returns the result plus headers describing how it was served. Raises
+    QueueFullError when the scheduler has no room. Both clock modes share
+    cache entries: code that reads the clock is never cached anyway.
+    """
+    cached = result_cache.get(code)
+    if cached is not None:
+        return cached, {"X-Cache": "HIT"}
+
+    rejected = preflight_python_code(code)
+    if rejected is not None:
+        return rejected, {"X-Cache": "MISS", "X-Preflight": "rejected"}
+
+    result, queue_depth, queue_wait = await execution_scheduler.submit(execute_python_code, code, virtual_clock)
+    if is_cacheable(result):
+        result_cache.put(code, result)
+    return result, {
+        "X-Cache": "MISS",
+        "X-Queue-Depth": str(queue_depth),
+        "X-Queue-Wait-Ms": str(round(queue_wait * 1000)),
+    }
+
+async def prewarm_result_cache():
+    """Run every lesson's example once so the first "Run" is a cache hit
+
+    Examples go through the scheduler one at a time, so prewarming never
+    holds more than one execution slot and backs off while it's full.
+    """
+    for lesson in list(get_lesson_catalog().lessons.values()):
+        code = lesson["code_example"]
+        if result_cache.get(code) is not None:
+            continue
+        while True:
+            try:
+                result, _, _ = await execution_scheduler.submit(execute_python_code, code)
+                break
+            except QueueFullError as e:
+                await asyncio.sleep(e.retry_after)
+        if is_cacheable(result):
+            result_cache.put(code, result)
 
 # API Routes
 @app.get("/")
@@ -385,20 +516,19 @@ async def root():
     return {"message": "LearnPython API is running!"}
 
 @app.post("/register", response_model=User)
-async def register(user: UserCreate):
+def register(user: UserCreate):
     if user.username in users_db:
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # In real app, hash the password
-    user_dict = user.model_dump()
-    user_dict["id"] = len(users_db) + 1
-    del user_dict["password"]
-    users_db[user.username] = user_dict
-    
-    return user_dict
+    try:
+        return users_db.create(user.username, user.email, user.full_name)
+    except IntegrityError:
+        # Lost a race with a concurrent registration
+        raise HTTPException(status_code=400, detail="Username already registered")
 
 @app.post("/login", response_model=Token)
-async def login(username: str, password: str):
+def login(username: str, password: str):
     if username not in users_db:
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
@@ -409,35 +539,313 @@ async def login(username: str, password: str):
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/lessons", response_model=List[Lesson])
-async def get_lessons():
-    return list(lessons_db.values())
+def collect_runtime_metrics() -> List[str]:
+    """Gauges read straight from the components at scrape time"""
+    lines = [
+        "# TYPE execution_queue_depth gauge",
+        f"execution_queue_depth {execution_scheduler.queue_depth}",
+        "# TYPE execution_running gauge",
+        f"execution_running {execution_scheduler.running}",
+        "# TYPE execution_idle_workers gauge",
+        f"execution_idle_workers {worker_pool.idle_workers}",
+    ]
+    for name, cache in (("execution_result_cache", result_cache), ("auth_token_cache", token_cache)):
+        stats = cache.stats()
+        lines += [
+            f"# TYPE {name}_hits_total counter",
+            f"{name}_hits_total {stats['hits']}",
+            f"# TYPE {name}_misses_total counter",
+            f"{name}_misses_total {stats['misses']}",
+            f"# TYPE {name}_entries gauge",
+            f"{name}_entries {stats['entries']}",
+        ]
+    return lines
+
+REGISTRY.add_collector(collect_runtime_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of request and execution metrics"""
+    return PlainTextResponse(REGISTRY.expose(), media_type="text/plain; version=0.0.4")
+
+@app.get("/auth/cache")
+async def get_token_cache_stats(token_data: TokenData = Depends(verify_token)):
+    """Hit/miss counters for the verified-token cache"""
+    return token_cache.stats()
+
+@app.get("/lessons", response_model=Union[List[Lesson], List[LessonSummary]])
+async def get_lessons(
+    request: Request,
+    summary: bool = False,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=100),
+):
+    """List lessons; summary=true drops content and code_example"""
+    return get_lesson_catalog().list_response(request.headers, summary, offset, limit)
+
+@app.get("/lessons/search", response_model=LessonSearchResponse)
+async def search_lessons(
+    q: str = "",
+    category: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Full-text search over lessons, optionally filtered by category and difficulty"""
+    total, matches = get_search_index().search(q, category, difficulty, offset, limit)
+    return {
+        "total": total,
+        "offset": offset,
+        "results": [
+            {**{field: lesson[field] for field in LessonSummary.model_fields}, "score": score}
+            for lesson, score in matches
+        ],
+    }
 
 @app.get("/lessons/{lesson_id}", response_model=Lesson)
-async def get_lesson(lesson_id: int):
-    if lesson_id not in lessons_db:
+async def get_lesson(lesson_id: int, request: Request):
+    response = get_lesson_catalog().lesson_response(lesson_id, request.headers)
+    if response is None:
         raise HTTPException(status_code=404, detail="Lesson not found")
-    return lessons_db[lesson_id]
+    return response
 
 @app.post("/progress")
-async def update_progress(progress: UserProgress, token_data: TokenData = Depends(verify_token)):
-    progress_key = f"{progress.user_id}_{progress.lesson_id}"
-    progress_db[progress_key] = progress.model_dump()
+def update_progress(progress: UserProgress, token_data: TokenData = Depends(verify_token)):
+    if progress.lesson_id not in get_lesson_catalog().lessons:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    progress_db.upsert(progress.model_dump())
     return {"message": "Progress updated successfully"}
 
+@app.post("/progress/batch")
+def update_progress_batch(batch: List[UserProgress], token_data: TokenData = Depends(verify_token)):
+    """Upsert many progress records at once, e.g. completions made offline"""
+    if len(batch) > PROGRESS_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {PROGRESS_BATCH_MAX_SIZE} progress records per batch",
+        )
+    lessons = get_lesson_catalog().lessons
+    unknown = sorted({progress.lesson_id for progress in batch if progress.lesson_id not in lessons})
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Lessons not found: {unknown}")
+    progress_db.upsert_many([progress.model_dump() for progress in batch])
+    return {"message": "Progress updated successfully", "updated": len(batch)}
+
+def completion_counts(started: int, completed: int) -> dict:
+    return {
+        "started": started,
+        "completed": completed,
+        "completion_rate": round(completed / started, 4) if started else 0.0,
+    }
+
+@app.get("/stats", response_model=ProgressStats)
+def get_stats(token_data: TokenData = Depends(verify_token)):
+    """Completion statistics, read from counters kept up to date on every write"""
+    lessons = get_lesson_catalog().lessons.values()
+    now = datetime.utcnow()
+    hours = [hour_bucket(now - timedelta(hours=ago)) for ago in range(STATS_RECENT_HOURS - 1, -1, -1)]
+    counters = progress_db.stats(["all", "lesson", "category", "difficulty"], hours)
+
+    def counts(scope: str, key) -> dict:
+        return completion_counts(*counters.get((scope, str(key)), (0, 0)))
+
+    return {
+        "total": counts("all", ""),
+        "lessons": [
+            {"lesson_id": lesson["id"], "title": lesson["title"], **counts("lesson", lesson["id"])}
+            for lesson in lessons
+        ],
+        "categories": {lesson["category"]: counts("category", lesson["category"]) for lesson in lessons},
+        "difficulties": {lesson["difficulty"]: counts("difficulty", lesson["difficulty"]) for lesson in lessons},
+        "recent_completions": [
+            {"hour": hour, "completions": counters.get(("hour", hour), (0, 0))[1]} for hour in hours
+        ],
+    }
+
+@app.get("/stats/users/{user_id}", response_model=UserStats)
+def get_user_stats(user_id: int, token_data: TokenData = Depends(verify_token)):
+    started, completed = progress_db.stat("user", str(user_id))
+    total_lessons = len(get_lesson_catalog())
+    return {
+        "user_id": user_id,
+        **completion_counts(started, completed),
+        "catalog_completion_rate": round(completed / total_lessons, 4) if total_lessons else 0.0,
+    }
+
 @app.get("/progress/{user_id}")
-async def get_user_progress(user_id: int, token_data: TokenData = Depends(verify_token)):
-    user_progress = []
-    for key, value in progress_db.items():
-        if key.startswith(f"{user_id}_"):
-            user_progress.append(value)
-    return user_progress
+def get_user_progress(user_id: int, token_data: TokenData = Depends(verify_token)):
+    return progress_db.for_user(user_id)
+
+@app.get("/lessons/{lesson_id}/progress")
+def get_lesson_progress(lesson_id: int, token_data: TokenData = Depends(verify_token)):
+    if lesson_id not in get_lesson_catalog().lessons:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    return progress_db.for_lesson(lesson_id)
 
 @app.post("/execute", response_model=CodeExecutionResponse)
-async def execute_code(request: CodeExecutionRequest):
+async def execute_code(request: CodeExecutionRequest, response: Response):
     """Execute Python code and return the result"""
-    return execute_python_code(request.code)
+    try:
+        result, headers = await run_python_code(request.code, request.virtual_clock)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many code executions in progress, please retry",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    response.headers.update(headers)
+    return result
+
+@app.post("/execute/batch", response_model=BatchExecutionResponse)
+async def execute_code_batch(batch: List[CodeExecutionRequest]):
+    """Execute several snippets in parallel and return results in order"""
+    if len(batch) > EXECUTION_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {EXECUTION_BATCH_MAX_SIZE} snippets per batch",
+        )
+
+    # Never more items in flight than the scheduler can hold, so a batch
+    # doesn't crowd out its own items; other traffic can still fill it, and
+    # then items wait for room the way prewarming does
+    limit = asyncio.Semaphore(min(
+        EXECUTION_BATCH_CONCURRENCY, execution_scheduler.max_concurrency + execution_scheduler.max_queue,
+    ))
+
+    async def run_item(item: CodeExecutionRequest) -> BatchExecutionItem:
+        async with limit:
+            started = time.perf_counter()
+            while True:
+                try:
+                    result, _ = await run_python_code(item.code, item.virtual_clock)
+                    break
+                except QueueFullError as e:
+                    await asyncio.sleep(e.retry_after)
+            duration_ms = (time.perf_counter() - started) * 1000
+            return BatchExecutionItem(**result.model_dump(), duration_ms=round(duration_ms, 3))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_item(item) for item in batch))
+    return BatchExecutionResponse(
+        results=results,
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/lessons/{lesson_id}/submit", response_model=SubmissionResponse)
+async def submit_lesson(lesson_id: int, request: CodeExecutionRequest):
+    """Grade code against the lesson's test cases"""
+    lesson = get_lesson_catalog().lessons.get(lesson_id)
+    if lesson is None:
+        raise HTTPException(status_code=404, detail="Lesson not found")
+    test_cases = lesson["test_cases"]
+    if not test_cases:
+        raise HTTPException(status_code=400, detail="Lesson has no test cases")
+
+    rejected = preflight_python_code(request.code)
+    if rejected is not None:
+        graded = {"results": grading.fail_all(test_cases, rejected.error), "exit_reason": "error"}
+    else:
+        try:
+            graded, _, _ = await execution_scheduler.submit(
+                grade_python_code, request.code, test_cases, request.virtual_clock
+            )
+        except QueueFullError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many code executions in progress, please retry",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    results = [TestCaseResult(**result) for result in graded.pop("results")]
+    passed_count = sum(result.passed for result in results)
+    return SubmissionResponse(
+        lesson_id=lesson_id,
+        passed=passed_count == len(results),
+        passed_count=passed_count,
+        total=len(results),
+        first_failure=next((result for result in results if not result.passed), None),
+        results=results,
+        **graded
+    )
+
+@app.post("/execute/stream")
+async def execute_code_stream(request: CodeExecutionRequest):
+    """Execute Python code, streaming its output as Server-Sent Events"""
+    rejected = preflight_python_code(request.code)
+    if rejected is not None:
+        async def rejection():
+            yield format_sse("stderr", rejected.error + "\n")
+            yield format_sse("result", {
+                "success": False,
+                "returncode": 1,
+                "error": "",
+                "truncated": False,
+                "exit_reason": rejected.exit_reason,
+            })
+        return StreamingResponse(rejection(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Preflight": "rejected"})
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def forward_events():
+        # Runs on a scheduler thread; hands each event to the response loop
+        try:
+            with closing(stream_python_code(request.code, request.virtual_clock)) as stream:
+                for event in stream:
+                    if cancelled.is_set():
+                        return
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+        except Exception as e:
+            # Say why the stream ended rather than leaving the client hanging
+            with suppress(RuntimeError):
+                loop.call_soon_threadsafe(events.put_nowait, ("result", {
+                    "success": False,
+                    "returncode": None,
+                    "error": f"Execution error: {str(e)}",
+                    "truncated": False,
+                    "exit_reason": "sandbox_error",
+                }))
+        finally:
+            with suppress(RuntimeError):
+                loop.call_soon_threadsafe(events.put_nowait, None)
+
+    try:
+        job = execution_scheduler.submit(forward_events)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many code executions in progress, please retry",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    async def event_source():
+        try:
+            while (event := await events.get()) is not None:
+                yield format_sse(*event)
+            await job
+        finally:
+            # Client went away: stop forwarding and let the job be killed
+            cancelled.set()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+@app.get("/execute/cache")
+async def get_execution_cache_stats(token_data: TokenData = Depends(verify_token)):
+    """Hit/miss counters for the execution result cache"""
+    return result_cache.stats()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # Once, before any worker starts
+    migrate()
+    # Workers share state through the database, so they can be scaled out
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=int(os.getenv("WEB_CONCURRENCY", "1"))) 
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Metrics are per process: each uvicorn worker counts only what it handled
+and labels its samples with worker="<pid>". A scrape through the shared
+port reaches whichever worker accepts it, so the label keeps the workers'
+series apart; sum over it, or run one worker per port and scrape each, to
+see the whole server.
+
+Recording has to stay cheap: it happens on every request and every
+execution. Each metric keeps one shard per thread, so observing a value is a
+plain dict update on data no other thread writes. Shards are only combined,
+under a lock, when /metrics is scraped.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            # Only a thread's first observation takes the lock
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> List[dict]:
+        with self._shards_lock:
+            return [dict(shard) for shard in self._shards]
+
+    def _labels(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return lines + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return sum(shard.get(labels, 0.0) for shard in self._snapshot())
+
+    def _totals(self) -> Dict[tuple, float]:
+        totals: Dict[tuple, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0.0) + value
+        return totals
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._labels(labels)} {_number(value)}"
+            for labels, value in sorted(self._totals().items())
+        ]
+
+
+class Gauge(Counter):
+    """Up/down value; only ever changed by inc/dec so shards still sum"""
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            series = shard[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def _snapshot(self) -> List[dict]:
+        with self._shards_lock:
+            # list(items()) copies in one step, safe against concurrent inserts
+            return [
+                {labels: list(series) for labels, series in list(shard.items())}
+                for shard in self._shards
+            ]
+
+    def count(self, *labels: str) -> int:
+        return sum(shard[labels][-1] for shard in self._snapshot() if labels in shard)
+
+    def _samples(self) -> List[str]:
+        totals: Dict[tuple, list] = {}
+        for shard in self._snapshot():
+            for labels, series in shard.items():
+                total = totals.setdefault(labels, [0] * len(self.buckets) + [0.0, 0])
+                for index, value in enumerate(series):
+                    total[index] += value
+
+        lines = []
+        for labels, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{self._labels(labels, inf)} {series[-1]}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Register a callable producing extra exposition lines at scrape time"""
+        self._collectors.append(collector)
+
+    def expose(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        for collector in self._collectors:
+            lines.extend(collector())
+        # See the module docstring
+        worker = f'worker="{os.getpid()}"'
+        return "\n".join(_with_label(line, worker) for line in lines) + "\n"
+
+
+def _with_label(line: str, label: str) -> str:
+    """A sample line with label added first; comments are left alone"""
+    if line.startswith("#"):
+        return line
+    name, _, rest = line.partition(" ")
+    if "{" in name:
+        # Label values may contain spaces, so split at the brace instead
+        name, _, rest = line.partition("{")
+        return f"{name}{{{label},{rest}"
+    return f"{name}{{{label}}} {rest}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REGISTRY = Registry()
+
+# HTTP
+http_requests_total = Counter(
+    "http_requests_total", "Requests handled, by route and status code", ("method", "route", "status"))
+http_request_errors_total = Counter(
+    "http_request_errors_total", "Requests that failed with a 5xx or an unhandled exception", ("method", "route"))
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route"))
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "Requests currently being handled")
+
+# Code execution
+execution_queue_wait_seconds = Histogram(
+    "execution_queue_wait_seconds", "Time executions waited for a scheduler slot")
+execution_spawn_seconds = Histogram(
+    "execution_spawn_seconds", "Time to start a sandbox worker process")
+execution_run_seconds = Histogram(
+    "execution_run_seconds", "Wall time of executed snippets")
+execution_results_total = Counter(
+    "execution_results_total", "Finished executions by exit reason", ("exit_reason",))
+execution_timeouts_total = Counter(
+    "execution_timeouts_total", "Executions killed for exceeding the wall-clock timeout")
+execution_preflight_rejections_total = Counter(
+    "execution_preflight_rejections_total", "Snippets rejected by the pre-flight check without running")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+        http_requests_in_progress.inc()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec()
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            http_request_duration_seconds.observe(time.perf_counter() - started, method, path)
+            http_requests_total.inc(method, path, str(status_code))
+            if status_code >= 500:
+                http_request_errors_total.inc(method, path)
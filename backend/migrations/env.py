@@ -0,0 +1,43 @@
+"""Alembic environment: migrates the database the API uses (DATABASE_URL)
+
+database.migrate() passes a connection of its own in config.attributes;
+otherwise one is taken from database.engine.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+import database
+
+config = context.config
+# Leave logging alone when the API runs the migrations itself
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+target_metadata = database.Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(url=database.DATABASE_URL, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations(connection):
+    context.configure(connection=connection, target_metadata=target_metadata)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+    with database.engine.connect() as connection:
+        run_migrations(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
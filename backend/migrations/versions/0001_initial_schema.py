@@ -0,0 +1,59 @@
+"""Users, lessons and progress
+
+The schema as metadata.create_all first made it, lesson bodies included.
+Databases created that way, before migrations existed, already have these
+tables; they are left as they are and only missing ones are created.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("username", sa.String(150), nullable=False),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("full_name", sa.String(255)),
+        )
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+    if "lessons" not in existing:
+        op.create_table(
+            "lessons",
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+            sa.Column("title", sa.String(255), nullable=False),
+            sa.Column("description", sa.Text, nullable=False),
+            sa.Column("content", sa.Text, nullable=False),
+            sa.Column("code_example", sa.Text, nullable=False),
+            sa.Column("difficulty", sa.String(50), nullable=False),
+            sa.Column("category", sa.String(100), nullable=False),
+        )
+        op.create_index("ix_lessons_difficulty", "lessons", ["difficulty"])
+        op.create_index("ix_lessons_category", "lessons", ["category"])
+    if "progress" not in existing:
+        op.create_table(
+            "progress",
+            sa.Column("user_id", sa.Integer, primary_key=True, autoincrement=False),
+            sa.Column("lesson_id", sa.Integer, sa.ForeignKey("lessons.id"), primary_key=True,
+                      autoincrement=False),
+            sa.Column("completed", sa.Boolean, nullable=False),
+            sa.Column("completed_at", sa.DateTime),
+        )
+        op.create_index("ix_progress_lesson_id", "progress", ["lesson_id"])
+
+
+def downgrade():
+    op.drop_table("progress")
+    op.drop_table("lessons")
+    op.drop_table("users")
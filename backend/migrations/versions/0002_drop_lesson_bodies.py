@@ -0,0 +1,32 @@
+"""Drop the lesson bodies from the lessons table
+
+They live in the lesson files now (see lesson_library). Users and progress
+are kept.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BODY_COLUMNS = ("content", "code_example")
+
+
+def upgrade():
+    present = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("lessons")}
+    for column in BODY_COLUMNS:
+        if column in present:
+            op.drop_column("lessons", column)
+
+
+def downgrade():
+    # The bodies themselves are gone; the catalog sync of a version that
+    # still stores them writes them again
+    for column in BODY_COLUMNS:
+        op.add_column("lessons", sa.Column(column, sa.Text, nullable=False, server_default=""))
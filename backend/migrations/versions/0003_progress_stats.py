@@ -0,0 +1,32 @@
+"""Progress counters
+
+The API fills the table from the progress rows the first time it starts
+against it (ProgressStore.ensure_stats).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "progress_stats" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "progress_stats",
+        sa.Column("scope", sa.String(20), primary_key=True),
+        sa.Column("key", sa.String(100), primary_key=True),
+        sa.Column("started", sa.Integer, nullable=False),
+        sa.Column("completed", sa.Integer, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("progress_stats")
@@ -0,0 +1,47 @@
+"""Pre-flight checks that reject broken snippets without starting a job.
+
+A large share of submissions don't even compile. Compiling in the API
+process (nothing is executed) catches those and returns exactly the error
+`python3` would have printed, without a scheduler slot or a fork. An
+optional deny-list of modules can reject obviously forbidden imports the
+same way.
+"""
+import ast
+import traceback
+from typing import Iterable, Optional
+
+# Sources this large are left to the sandbox rather than compiled in-process
+MAX_PREFLIGHT_SOURCE_BYTES = 256 * 1024
+
+
+def _format_exception(error: BaseException) -> str:
+    return "".join(traceback.format_exception_only(type(error), error)).strip()
+
+
+def check_code(code: str, forbidden_modules: Iterable[str] = ()) -> Optional[str]:
+    """Return the error the code would fail with before running, or None"""
+    if len(code) > MAX_PREFLIGHT_SOURCE_BYTES:
+        return None
+    try:
+        compile(code, "<string>", "exec", dont_inherit=True)
+    except (SyntaxError, ValueError) as e:
+        return _format_exception(e)
+    except (MemoryError, RecursionError):
+        # Pathological input; let the sandbox deal with it under its limits
+        return None
+
+    forbidden = set(forbidden_modules)
+    if not forbidden:
+        return None
+    for node in ast.walk(ast.parse(code)):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module or ""]
+        else:
+            continue
+        for name in names:
+            if name.split(".")[0] in forbidden:
+                error = ImportError(f"import of '{name}' is not allowed here")
+                return f'File "<string>", line {node.lineno}\n{_format_exception(error)}'
+    return None
@@ -0,0 +1,119 @@
+"""Cache of /execute results for snippets whose output cannot change.
+
+Most runs are students pressing "Run" on an unmodified lesson example, which
+always prints the same thing. Results are keyed by a hash of the code and
+the interpreter version that produced them, kept in a bounded LRU with a
+TTL. Snippets that read the clock, randomness, threads, stdin, files or the
+environment are never cached.
+"""
+import ast
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+NONDETERMINISTIC_MODULES = {
+    "asyncio", "concurrent", "datetime", "multiprocessing", "os", "random",
+    "secrets", "socket", "subprocess", "threading", "time", "urllib", "uuid",
+}
+NONDETERMINISTIC_CALLS = {"input", "open", "id", "hash", "__import__", "exec", "eval"}
+
+
+def is_deterministic(code: str) -> bool:
+    """Best-effort check that running code twice prints the same thing"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        # Always fails the same way
+        return True
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [node.module or ""]
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id in NONDETERMINISTIC_CALLS:
+                return False
+            continue
+        else:
+            continue
+        if any(name.split(".")[0] in NONDETERMINISTIC_MODULES for name in names):
+            return False
+    return True
+
+
+class ResultCache:
+    """Thread-safe LRU of execution results with a per-entry TTL
+
+    Also used for values that aren't execution results, such as verified
+    tokens, with only_deterministic off.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, namespace: str = "",
+                 only_deterministic: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        # Off for values that depend only on the source, not on running it
+        self.only_deterministic = only_deterministic
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, code: str) -> str:
+        return hashlib.sha256(f"{self.namespace}\0{code}".encode()).hexdigest()
+
+    def get(self, code: str) -> Optional[Any]:
+        key = self.key(code)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, code: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        """Store value, unless only deterministic code is cached and this isn't
+
+        ttl_seconds shortens the cache's TTL for this entry, for values that
+        go stale on their own schedule. Returns whether the value was cached.
+        """
+        if self.max_entries <= 0:
+            return False
+        if self.only_deterministic and not is_deterministic(code):
+            return False
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return False
+        key = self.key(code)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
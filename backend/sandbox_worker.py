@@ -0,0 +1,498 @@
+"""Pre-started Python interpreter that runs LearnPython snippets.
+
+The API keeps a pool of these processes warm (see execution.py). Each one
+reads length-prefixed JSON jobs from stdin and answers on stdout. Jobs never
+run inside the worker itself: the worker forks a child per job, so every
+snippet starts from the same clean, already-initialised interpreter and
+nothing it does leaks into the next job.
+
+Every job ends with a "result" message. Streaming jobs are preceded by
+"chunk" messages carrying output as it is produced; buffered jobs return all
+output in the result instead. Either way at most `max_output_bytes` of each
+stream is kept, so a runaway print loop cannot grow memory without bound.
+
+Every message carries the `id` the API sent with the job. The worker isn't
+dumpable, so its own jobs can't reach its protocol pipes through /proc, and
+a message for any other id tells the API the framing can't be trusted.
+
+Jobs run under the CPU, address-space and process-count rlimits given in
+`limits`, and the result reports what the run cost and why it ended.
+
+Jobs sent with `virtual_clock` run against a simulated clock: sleeping,
+including asyncio's, moves time forward instead of waiting for it.
+
+Jobs sent with `reports` get a pipe on REPORT_FD besides stdout and stderr;
+whatever the job writes there comes back in the result's "reports", kept
+apart from anything it prints.
+"""
+import codecs
+import json
+import os
+import resource
+import selectors
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+
+HEADER = struct.Struct(">I")
+PR_SET_DUMPABLE = 4
+# Descriptor of the report pipe in jobs that ask for one
+REPORT_FD = 3
+# Longest gap between checks on a job that closed its output but hasn't exited
+EXIT_POLL_SECONDS = 0.01
+
+RLIMITS = {
+    "cpu_seconds": getattr(resource, "RLIMIT_CPU", None),
+    "memory_bytes": getattr(resource, "RLIMIT_AS", None),
+    "processes": getattr(resource, "RLIMIT_NPROC", None),
+}
+
+# Process group of the job currently running, if any
+current_job = None
+# Id the API gave that job; every frame about it carries it
+current_job_id = None
+
+
+def read_exact(fd, size):
+    data = b""
+    while len(data) < size:
+        chunk = os.read(fd, size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def read_frame(fd):
+    header = read_exact(fd, HEADER.size)
+    if header is None:
+        return None
+    body = read_exact(fd, HEADER.unpack(header)[0])
+    if body is None:
+        return None
+    return json.loads(body)
+
+
+def write_frame(fd, message):
+    body = json.dumps(message).encode()
+    data = HEADER.pack(len(body)) + body
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
+
+
+def set_dumpable(dumpable):
+    """Whether processes of the same user may ptrace us or reopen our /proc fds
+
+    The worker turns this off so the jobs it forks, which run as the same
+    user, can't open /proc/<worker>/fd and write frames of their own.
+    Privileged jobs (CAP_SYS_PTRACE, e.g. root) are not stopped by it; the
+    API also drops any worker that sends a frame for the wrong job.
+    """
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(PR_SET_DUMPABLE, int(dumpable), 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+
+
+def apply_limits(limits):
+    for name, value in (limits or {}).items():
+        limit = RLIMITS.get(name)
+        if limit is None or not value:
+            continue
+        _, hard = resource.getrlimit(limit)
+        # For CPU the soft limit raises SIGXCPU; the hard one is a backstop
+        soft_value = value
+        hard_value = value + 1 if name == "cpu_seconds" else value
+        if hard != resource.RLIM_INFINITY:
+            soft_value, hard_value = min(soft_value, hard), min(hard_value, hard)
+        resource.setrlimit(limit, (soft_value, hard_value))
+
+
+class VirtualClock:
+    """Simulated time for jobs that sleep a lot and compute little
+
+    time.sleep jumps the clock forward instead of waiting, and time.time,
+    monotonic and perf_counter (hence the asyncio loop clock) read the jumped
+    clock. Threads still wake in the order a real run would wake them: the
+    clock only jumps to the earliest pending wake-up once every other thread
+    is asleep or blocked, or nothing has happened for GRACE seconds (a thread
+    can look busy while actually waiting, e.g. on a contended lock).
+    """
+
+    GRACE = 0.02
+    POLL = 0.001
+    # Functions that, on top of a thread's stack, mean it's waiting on another
+    BLOCKING_FUNCTIONS = {
+        "threading": {"wait", "_wait_for_tstate_lock", "_shutdown"},
+        "queue": {"get", "put"},
+        "selectors": {"select"},
+        "concurrent.futures.thread": {"_worker"},
+    }
+
+    def __init__(self):
+        import threading
+
+        self._threading = threading
+        self._real_sleep = time.sleep
+        self._real_monotonic = time.monotonic
+        self._real_time = time.time
+        self._real_perf_counter = time.perf_counter
+        self.offset = 0.0
+        self._condition = threading.Condition(threading.Lock())
+        # thread ident -> (virtual deadline, arrival order)
+        self._sleepers = {}
+        self._arrivals = 0
+
+    def install(self):
+        time.sleep = self.sleep
+        time.monotonic = self.monotonic
+        time.time = self.time
+        time.perf_counter = self.perf_counter
+        time.monotonic_ns = lambda: int(self.monotonic() * 1e9)
+        time.time_ns = lambda: int(self.time() * 1e9)
+        time.perf_counter_ns = lambda: int(self.perf_counter() * 1e9)
+        # asyncio builds its loop selector from selectors.DefaultSelector
+        selectors.DefaultSelector = self.selector_class(selectors.DefaultSelector)
+
+    def monotonic(self):
+        return self._real_monotonic() + self.offset
+
+    def time(self):
+        return self._real_time() + self.offset
+
+    def perf_counter(self):
+        return self._real_perf_counter() + self.offset
+
+    def sleep(self, seconds, interrupt=None):
+        """Return once the clock reaches now + seconds, or interrupt() is true"""
+        if not isinstance(seconds, (int, float)) or seconds <= 0:
+            # Let the real sleep yield, or raise its usual errors
+            return self._real_sleep(seconds)
+
+        ident = self._threading.get_ident()
+        with self._condition:
+            deadline = self.monotonic() + seconds
+            self._arrivals += 1
+            self._sleepers[ident] = (deadline, self._arrivals)
+            self._condition.notify_all()
+            quiet_since = self._real_monotonic()
+            try:
+                while True:
+                    now = self.monotonic()
+                    if now >= deadline or (interrupt is not None and interrupt()):
+                        return
+                    earliest = min(self._sleepers.values()) == self._sleepers[ident]
+                    if earliest and (
+                        self._real_monotonic() - quiet_since >= self.GRACE or self._others_waiting(ident)
+                    ):
+                        self.offset += deadline - now
+                        return
+                    poll = self.POLL if earliest or interrupt is not None else None
+                    if self._condition.wait(poll):
+                        quiet_since = self._real_monotonic()
+            finally:
+                del self._sleepers[ident]
+                self._condition.notify_all()
+
+    def _others_waiting(self, ident):
+        blocking = {
+            sys.modules[name].__file__: names
+            for name, names in self.BLOCKING_FUNCTIONS.items()
+            if name in sys.modules
+        }
+        threading_file = self._threading.__file__
+        for other, frame in sys._current_frames().items():
+            if other == ident or other in self._sleepers:
+                continue
+            code = frame.f_code
+            if code.co_name not in blocking.get(code.co_filename, ()):
+                return False
+            # Thread.start() waits for the new thread, which is about to run
+            while frame is not None:
+                if frame.f_code.co_name == "start" and frame.f_code.co_filename == threading_file:
+                    return False
+                frame = frame.f_back
+        return True
+
+    def selector_class(self, base):
+        clock = self
+
+        class VirtualSelector(base):
+            def select(self, timeout=None):
+                if timeout is None or timeout <= 0:
+                    return super().select(timeout)
+                # Nothing to do until the next timer: jump to it, unless I/O
+                # (such as a call_soon_threadsafe wake-up) arrives first
+                ready = []
+
+                def io_ready():
+                    ready[:] = base.select(self, 0)
+                    return ready
+
+                clock.sleep(timeout, interrupt=io_ready)
+                return ready or super().select(0)
+
+        return VirtualSelector
+
+
+def run_snippet(code, stream, status_fd, virtual_clock=False):
+    """Run user code the way `python3 script.py` would; never returns"""
+    import builtins
+    import traceback
+    import types
+
+    if virtual_clock:
+        VirtualClock().install()
+    if stream:
+        # Pipes are block-buffered; flush every line so output arrives live
+        sys.stdout.reconfigure(line_buffering=True)
+
+    main_module = types.ModuleType("__main__")
+    main_module.__builtins__ = builtins
+    sys.modules["__main__"] = main_module
+    sys.argv = [""]
+
+    exit_code = 0
+    try:
+        exec(compile(code, "<string>", "exec"), main_module.__dict__)
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException as e:
+        if isinstance(e, MemoryError):
+            os.write(status_fd, b"memory_limit")
+        # Drop this frame so the traceback starts at the user's code
+        tb = e.__traceback__.tb_next if e.__traceback__ else None
+        traceback.print_exception(type(e), e, tb)
+        exit_code = 1
+
+    # Mirror interpreter shutdown: wait for non-daemon threads, run atexit
+    if "threading" in sys.modules:
+        sys.modules["threading"]._shutdown()
+    import atexit
+    atexit._run_exitfuncs()
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(exit_code & 0xFF)
+
+
+class OutputCapture:
+    """At most `limit` bytes of one of the job's output streams
+
+    Buffered captures keep either the beginning of the output or, for
+    stderr, the end, where the traceback is. Streaming captures forward the
+    first `limit` bytes as chunk messages and hold nothing back.
+    """
+
+    def __init__(self, name, limit, keep_tail=False, stream=False):
+        self.name = name
+        self.limit = limit
+        self.keep_tail = keep_tail
+        self.stream = stream
+        self.data = bytearray()
+        self.seen = 0
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    @property
+    def truncated(self):
+        return self.seen > self.limit
+
+    def feed(self, chunk):
+        room = self.limit - min(self.seen, self.limit)
+        self.seen += len(chunk)
+        if self.stream:
+            if room > 0:
+                self.emit(self.decoder.decode(chunk[:room]))
+        elif self.keep_tail:
+            self.data += chunk
+            if len(self.data) > self.limit:
+                del self.data[:len(self.data) - self.limit]
+        elif room > 0:
+            self.data += chunk[:room]
+
+    def emit(self, text):
+        if text:
+            write_frame(PROTO_OUT, {"type": "chunk", "job": current_job_id, "stream": self.name, "data": text})
+
+    def finish(self):
+        """Return the captured text (empty when streaming)"""
+        if self.stream:
+            self.emit(self.decoder.decode(b"", final=True))
+            return ""
+        return self.data.decode(errors="replace")
+
+
+def exit_reason(returncode, timed_out, cpu_seconds, limits, status):
+    if timed_out:
+        return "timeout"
+    if status:
+        return status
+    cpu_limit = (limits or {}).get("cpu_seconds")
+    if returncode == -signal.SIGXCPU or (
+        returncode == -signal.SIGKILL and cpu_limit and cpu_seconds >= cpu_limit
+    ):
+        return "cpu_limit"
+    if returncode < 0:
+        return "crash"
+    return "ok" if returncode == 0 else "error"
+
+
+def run_job(job):
+    stream = job.get("stream", False)
+    limits = job.get("limits")
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    status_r, status_w = os.pipe()
+    report_r, report_w = os.pipe() if job.get("reports") else (None, None)
+    # Files a snippet writes land in a scratch directory that goes away with it
+    workdir = tempfile.mkdtemp(prefix="snippet-")
+    global current_job, current_job_id
+    current_job_id = job.pop("id", None)
+    started_at = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        current_job_id = None
+        # Only the worker needs to stay out of reach (see set_dumpable)
+        set_dumpable(True)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.setpgrp()
+        os.chdir(workdir)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(out_w, 1)
+        os.dup2(err_w, 2)
+        for fd in (devnull, out_r, out_w, err_r, err_w, status_r, report_r, PROTO_IN, PROTO_OUT):
+            if fd is not None:
+                os.close(fd)
+        if report_w is not None and report_w != REPORT_FD:
+            os.dup2(report_w, REPORT_FD)
+            os.close(report_w)
+        apply_limits(limits)
+        run_snippet(job["code"], stream, status_w, job.get("virtual_clock", False))
+
+    current_job = pid
+    os.close(out_w)
+    os.close(err_w)
+    os.close(status_w)
+    limit = job.get("max_output_bytes") or sys.maxsize
+    captures = {
+        out_r: OutputCapture("stdout", limit, stream=stream),
+        err_r: OutputCapture("stderr", limit, keep_tail=True, stream=stream),
+    }
+    if report_r is not None:
+        os.close(report_w)
+        captures[report_r] = OutputCapture("reports", limit)
+    deadline = time.monotonic() + job["timeout"]
+    timed_out = False
+
+    with selectors.DefaultSelector() as selector:
+        for fd in captures:
+            selector.register(fd, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            for key, _ in selector.select(remaining):
+                chunk = os.read(key.fd, 65536)
+                if chunk:
+                    # Past the limit we keep draining so the job never
+                    # blocks on a full pipe, but nothing more is kept
+                    captures[key.fd].feed(chunk)
+                else:
+                    selector.unregister(key.fd)
+
+    # A job can close its output and keep running; the deadline still holds
+    waited, poll = None, 0.0002
+    while not timed_out:
+        waited = os.wait4(pid, os.WNOHANG)
+        if waited[0] != 0:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        time.sleep(min(poll, remaining))
+        poll = min(poll * 2, EXIT_POLL_SECONDS)
+
+    if timed_out:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        waited = os.wait4(pid, 0)
+    _, status, usage = waited
+    wall_seconds = time.monotonic() - started_at
+    current_job = None
+    reported = os.read(status_r, 64).decode()
+    for fd in (*captures, status_r):
+        os.close(fd)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    returncode = os.waitstatus_to_exitcode(status)
+    cpu_seconds = usage.ru_utime + usage.ru_stime
+    # ru_maxrss is in kilobytes on Linux but bytes on macOS
+    peak_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+
+    result = {
+        "type": "result",
+        "job": current_job_id,
+        "stdout": captures[out_r].finish(),
+        "stderr": captures[err_r].finish(),
+        "returncode": returncode,
+        "timed_out": timed_out,
+        "truncated": captures[out_r].truncated or captures[err_r].truncated,
+        "wall_time_ms": round(wall_seconds * 1000, 3),
+        "cpu_time_ms": round(cpu_seconds * 1000, 3),
+        "peak_rss_kb": peak_rss_kb,
+        "exit_reason": exit_reason(returncode, timed_out, cpu_seconds, limits, reported),
+    }
+    if report_r is not None:
+        result["reports"] = captures[report_r].finish()
+    return result
+
+
+def terminate(signum, frame):
+    """The API is discarding us: take the running job down too"""
+    if current_job is not None:
+        try:
+            os.killpg(current_job, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, terminate)
+    set_dumpable(False)
+
+    # Keep the protocol pipes on private descriptors so nothing printed by
+    # the worker (or inherited by a job) can corrupt the framing
+    PROTO_IN = os.dup(0)
+    PROTO_OUT = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    # Snippets should not be able to import the API modules next to us
+    if sys.path and sys.path[0] == os.path.dirname(os.path.abspath(__file__)):
+        sys.path[0] = ""
+
+    while True:
+        job = read_frame(PROTO_IN)
+        if job is None:
+            break
+        write_frame(PROTO_OUT, run_job(job))
@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# Point the app at a throwaway database before main is imported
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='learnpython-tests-'), 'test.db')}",
+)
+
+import database
+
+# As a deploy would, before the app serves anything
+database.migrate()
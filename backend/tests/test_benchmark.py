@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+
+import benchmark
+
+def test_benchmark_writes_comparable_results(tmp_path):
+    output = tmp_path / "results.json"
+    # Run in its own process and database so its users and progress don't
+    # leak into the other tests
+    argv = [
+        sys.executable, benchmark.__file__,
+        "--scenario", "lesson",
+        "--scenario", "progress_write",
+        "--scenario", "execute",
+        "--concurrency", "2",
+        "--requests", "6",
+        "--execute-requests", "2",
+        "--output", str(output),
+    ]
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'bench.db'}"}
+    subprocess.run(argv, env=env, check=True, capture_output=True, timeout=120)
+    saved = json.loads(output.read_text())
+    assert saved["scenarios"].keys() == {"lesson", "progress_write", "execute"}
+    for result in saved["scenarios"].values():
+        assert result["errors"] == 0
+        assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+    assert benchmark.compare(saved, saved)
+
+def test_percentile():
+    values = [float(n) for n in range(1, 101)]
+    assert benchmark.percentile(values, 0.50) == 50.0
+    assert benchmark.percentile(values, 0.99) == 99.0
+    assert benchmark.percentile([], 0.5) == 0.0
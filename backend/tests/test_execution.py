@@ -0,0 +1,155 @@
+import asyncio
+import os
+import threading
+
+import pytest
+from execution import ExecutionScheduler, QueueFullError, WorkerError, WorkerPool
+
+def test_worker_pool_recycles_workers():
+    pool = WorkerPool(size=1, max_jobs_per_worker=1)
+    pool.start()
+    try:
+        first = pool.run("import os\nprint(os.getppid())", timeout=5)
+        second = pool.run("import os\nprint(os.getppid())", timeout=5)
+    finally:
+        pool.close()
+    assert first["returncode"] == 0
+    assert first["stdout"] != second["stdout"]
+
+def test_worker_pool_timeout():
+    pool = WorkerPool(size=1, max_jobs_per_worker=10)
+    try:
+        result = pool.run("while True:\n    pass", timeout=0.5)
+        assert result["timed_out"] is True
+        # The worker survives a runaway job and keeps serving
+        assert pool.run("print('ok')", timeout=5)["stdout"] == "ok\n"
+    finally:
+        pool.close()
+
+def test_worker_pool_timeout_after_output_closed():
+    pool = WorkerPool(size=1, max_jobs_per_worker=10)
+    try:
+        result = pool.run("import os, time\nos.close(1)\nos.close(2)\ntime.sleep(30)", timeout=0.5)
+    finally:
+        pool.close()
+    assert result["timed_out"] is True
+    assert result["exit_reason"] == "timeout"
+    assert result["wall_time_ms"] < 5000
+
+def test_worker_pool_virtual_clock():
+    code = (
+        "import asyncio, threading, time\n"
+        "def worker(name, delay):\n"
+        "    time.sleep(delay)\n"
+        "    print(name, flush=True)\n"
+        "threads = [threading.Thread(target=worker, args=args) for args in (('A', 30), ('B', 10))]\n"
+        "started = time.monotonic()\n"
+        "for thread in threads:\n"
+        "    thread.start()\n"
+        "for thread in threads:\n"
+        "    thread.join()\n"
+        "async def tick(name, delay):\n"
+        "    await asyncio.sleep(delay)\n"
+        "    print(name)\n"
+        "async def main():\n"
+        "    await asyncio.gather(tick('C', 20), tick('D', 5))\n"
+        "asyncio.run(main())\n"
+        "print(round(time.monotonic() - started))\n"
+    )
+    pool = WorkerPool(size=1, max_jobs_per_worker=10)
+    try:
+        result = pool.run(code, timeout=5, virtual_clock=True)
+    finally:
+        pool.close()
+    # 50 simulated seconds, same order as a real run, well inside the timeout
+    assert result["stdout"].split() == ["B", "A", "D", "C", "50"]
+    assert result["wall_time_ms"] < 5000
+
+def test_scheduler_rejects_when_queue_is_full():
+    scheduler = ExecutionScheduler(max_concurrency=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(scheduler.submit(release.wait))
+        await asyncio.sleep(0.1)
+        queued = asyncio.ensure_future(scheduler.submit(lambda: "done"))
+        await asyncio.sleep(0.1)
+        assert scheduler.running == 1
+        assert scheduler.queue_depth == 1
+        with pytest.raises(QueueFullError) as excinfo:
+            await scheduler.submit(lambda: None)
+        assert excinfo.value.retry_after >= 1
+        release.set()
+        await running
+        result, depth, waited = await queued
+        assert result == "done"
+        assert depth == 0
+        assert waited > 0
+
+    asyncio.run(scenario())
+
+def test_worker_pool_keeps_stderr_tail():
+    pool = WorkerPool(size=1, max_jobs_per_worker=10)
+    try:
+        code = "import sys\nsys.stderr.write('noise ' * 1000)\nraise RuntimeError('the end')"
+        result = pool.run(code, timeout=5, max_output_bytes=200)
+    finally:
+        pool.close()
+    assert result["truncated"] is True
+    assert len(result["stderr"]) <= 200
+    assert result["stderr"].rstrip().endswith("RuntimeError: the end")
+
+def test_worker_pool_cpu_limit():
+    pool = WorkerPool(size=1, max_jobs_per_worker=10)
+    try:
+        result = pool.run("while True:\n    pass", timeout=5, limits={"cpu_seconds": 1})
+    finally:
+        pool.close()
+    assert result["timed_out"] is False
+    assert result["exit_reason"] == "cpu_limit"
+    # The kernel checks RLIMIT_CPU on clock ticks, so the run can be charged
+    # up to one tick less than the limit
+    assert result["cpu_time_ms"] >= 1000 - 1000 / os.sysconf("SC_CLK_TCK")
+
+def test_worker_pool_rejects_forged_frames():
+    # The job tries to answer for itself, and for the next job, by writing
+    # frames straight to the worker's protocol pipe
+    forge = (
+        "import json, os, struct\n"
+        "def frame(stdout):\n"
+        "    body = json.dumps({'type': 'result', 'stdout': stdout, 'stderr': '', 'returncode': 0,\n"
+        "                       'timed_out': False, 'exit_reason': 'ok', 'truncated': False,\n"
+        "                       'wall_time_ms': 1, 'cpu_time_ms': 1, 'max_rss_kb': 1}).encode()\n"
+        "    return struct.pack('>I', len(body)) + body\n"
+        "try:\n"
+        "    fd = os.open(f'/proc/{os.getppid()}/fd/4', os.O_WRONLY)\n"
+        "except OSError:\n"
+        "    print('blocked')\n"
+        "else:\n"
+        "    os.write(fd, frame('forged') + frame('forged for the next job'))\n"
+    )
+    pool = WorkerPool(size=1, max_jobs_per_worker=10)
+    try:
+        try:
+            result = pool.run(forge, timeout=5)
+        except WorkerError:
+            pass
+        else:
+            assert result["stdout"] == "blocked\n"
+        assert pool.run("print('mine')", timeout=5)["stdout"] == "mine\n"
+    finally:
+        pool.close()
+
+def test_histogram_shards_are_merged():
+    from metrics import Histogram, REGISTRY
+    histogram = Histogram("test_latency_seconds", "Test histogram", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    worker = threading.Thread(target=histogram.observe, args=(0.5, "/a"))
+    worker.start()
+    worker.join()
+    assert histogram.count("/a") == 2
+    body = REGISTRY.expose()
+    worker = f'worker="{os.getpid()}"'
+    assert f'test_latency_seconds_bucket{{{worker},route="/a",le="0.1"}} 1' in body
+    assert f'test_latency_seconds_bucket{{{worker},route="/a",le="1"}} 2' in body
+    assert f'test_latency_seconds_count{{{worker},route="/a"}} 2' in body
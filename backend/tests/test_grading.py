@@ -0,0 +1,83 @@
+import os
+import resource
+import subprocess
+import sys
+
+from grading import build_program, exit_reason, grade, normalize_output, parse_results, values_match
+
+CASES = [
+    {"name": "echo", "stdin": "Ana\n", "expected_stdout": "Hello, Ana!"},
+    {"name": "add", "call": "add(2, 3)", "expected": "5"},
+    {"name": "add negative", "call": "add(-2, 3)", "expected": "-5"},
+]
+
+def run(code, cases, cpu_seconds=None):
+    def limit_cpu():
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+
+    report_r, report_w = os.pipe()
+    with subprocess.Popen([sys.executable, "-c", build_program(code, cases, report_w)],
+                          stdout=subprocess.DEVNULL, pass_fds=(report_w,),
+                          preexec_fn=limit_cpu if cpu_seconds else None):
+        os.close(report_w)
+        with os.fdopen(report_r) as reports:
+            return parse_results(reports.read())
+
+def test_grades_stdin_and_function_cases():
+    code = "import sys\ndef add(a, b):\n    return a + b\nname = sys.stdin.readline().strip()\nif name:\n    print(f'Hello, {name}!')"
+    results = grade(CASES, run(code, CASES))
+    assert [result["passed"] for result in results] == [True, True, False]
+    assert all(result["duration_ms"] is not None for result in results)
+    assert results[2]["diff"].splitlines()[-2:] == ["--5", "+1"]
+
+def test_errors_and_cases_that_never_ran():
+    reported = run("print(input())", CASES[:1])
+    results = grade(CASES, reported, "Code execution timed out (max 10 seconds)")
+    assert results[0]["passed"] is False and results[0]["diff"]
+    assert results[1]["error"] == "Code execution timed out (max 10 seconds)"
+    assert results[2]["error"] == "Not run" and results[2]["duration_ms"] is None
+
+    reported = run("def add(a, b):\n    raise ValueError('nope')", CASES[1:])
+    assert [report["error"] for report in reported] == ["ValueError: nope"] * 2
+
+    reported = run("def add(a, b) return a", CASES)
+    assert all(report["error"].endswith("SyntaxError: expected ':'") for report in reported)
+
+def test_reports_cases_killed_by_a_limit():
+    code = "import sys\ndef add(a, b):\n    return a + b\nif sys.stdin.readline():\n    while True:\n        pass"
+    reported = run(code, CASES, cpu_seconds=1)
+    assert reported[0]["exit_reason"] == "cpu_limit"
+    assert reported[0]["error"] == "Submission exceeded the CPU time limit (max 1 seconds)"
+    # The other cases run in children of their own and still count
+    assert [report.get("error") for report in reported[1:]] == [None, None]
+    assert exit_reason(reported, "ok") == "cpu_limit"
+
+    reported = run("import os\nos._exit(0)", CASES[:1])
+    assert reported[0]["error"] == "Submission exited before this case finished"
+    assert "exit_reason" not in reported[0]
+
+def test_output_comparison_ignores_trailing_whitespace():
+    assert normalize_output("a  \nb\n\n") == normalize_output("a\nb")
+    assert normalize_output("a\n\nb") != normalize_output("a\nb")
+
+def test_submission_cannot_touch_its_own_grade():
+    # Objects that claim to equal anything are compared by repr, as literals
+    code = "class Any:\n    def __eq__(self, other):\n        return True\ndef add(a, b):\n    return Any()"
+    results = grade(CASES[1:], run(code, CASES[1:]))
+    assert not any(result["passed"] for result in results)
+    assert values_match("5", "5") and not values_match("5", "'5'")
+
+    # Nothing the submission can write to reaches the report pipe
+    code = (
+        "import os\n"
+        "for fd in range(3, 256):\n"
+        "    try:\n"
+        "        os.write(fd, b'{\"case\": 0, \"duration_ms\": 0, \"actual\": \"5\"}\\n' * 5)\n"
+        "    except OSError:\n"
+        "        pass\n"
+        "def add(a, b):\n"
+        "    return 0"
+    )
+    reported = run(code, CASES[1:])
+    assert [report["case"] for report in reported] == [0, 1]
+    assert all(report["error"] == "Submission wrote to the grader out of turn" for report in reported)
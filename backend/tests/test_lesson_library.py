@@ -0,0 +1,65 @@
+import json
+import os
+
+from lesson_library import LessonLibrary
+
+def write_lessons(directory, titles):
+    entries = []
+    for lesson_id, title in enumerate(titles, start=1):
+        path = f"{lesson_id:02d}"
+        os.makedirs(directory / path, exist_ok=True)
+        (directory / path / "content.md").write_text(f"All about {title}.\n")
+        (directory / path / "example.py").write_text(f"print({title!r})\n")
+        entries.append({"id": lesson_id, "title": title, "description": title, "difficulty": "beginner",
+                        "category": "basics", "path": path})
+    (directory / "catalog.json").write_text(json.dumps({"lessons": entries}))
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def test_bodies_load_on_first_access(tmp_path):
+    write_lessons(tmp_path, ["Hello", "Loops"])
+    lessons = LessonLibrary(str(tmp_path)).load()
+    assert [lesson["title"] for lesson in lessons] == ["Hello", "Loops"]
+    assert not any(lesson.body_loaded for lesson in lessons)
+
+    assert lessons[0]["code_example"] == "print('Hello')"
+    assert lessons[0].body_loaded and not lessons[1].body_loaded
+    # Reading the example leaves the content on disk
+    assert not lessons[0].loaded("content")
+    assert dict(lessons[1])["content"] == "All about Loops."
+    assert list(lessons[1]) == ["id", "title", "description", "content", "code_example", "difficulty", "category",
+                                "test_cases"]
+    assert lessons[1]["test_cases"] == []
+
+def test_reload_only_after_a_change(tmp_path):
+    write_lessons(tmp_path, ["Hello", "Loops"])
+    library = LessonLibrary(str(tmp_path))
+    first = library.load()
+    assert library.reload_if_changed() is None
+
+    (tmp_path / "02" / "example.py").write_text("print('edited')\n")
+    bump_mtime(tmp_path / "02" / "example.py")
+    second = library.reload_if_changed()
+    assert second is not None
+    assert second[1]["code_example"] == "print('edited')"
+    # Unchanged lessons compare equal without reading their bodies
+    assert second[0] == first[0] and second[1] != first[1]
+    assert not second[0].body_loaded
+    assert library.reload_if_changed() is None
+
+def test_broken_catalog_is_skipped(tmp_path):
+    write_lessons(tmp_path, ["Hello"])
+    library = LessonLibrary(str(tmp_path))
+    library.load()
+
+    (tmp_path / "catalog.json").write_text('{"lessons": [')
+    bump_mtime(tmp_path / "catalog.json")
+    assert library.reload_if_changed() is None
+    # Not retried until the files change again
+    assert not library.changed()
+
+    write_lessons(tmp_path, ["Hello", "Loops"])
+    bump_mtime(tmp_path / "catalog.json")
+    assert [lesson["title"] for lesson in library.reload_if_changed()] == ["Hello", "Loops"]
@@ -0,0 +1,35 @@
+from lesson_search import LessonSearchIndex, tokenize
+
+LESSONS = [
+    {"id": 1, "title": "Hello World", "description": "Print text", "content": "Use print to output text.",
+     "difficulty": "beginner", "category": "basics"},
+    {"id": 2, "title": "Loops", "description": "Repeat work with for loops", "content": "A for loop can print items.",
+     "difficulty": "beginner", "category": "basics"},
+    {"id": 3, "title": "Decorators", "description": "Wrap functions", "content": "Decorators wrap a function.",
+     "difficulty": "advanced", "category": "functions"},
+]
+
+def test_tokenize_drops_stop_words():
+    assert tokenize("The print() functions, in Python 3") == ["print", "function", "python", "3"]
+    assert tokenize("class") == ["class"]
+
+def test_title_matches_rank_first():
+    index = LessonSearchIndex(LESSONS)
+    total, results = index.search("print")
+    assert total == 2
+    assert [lesson["id"] for lesson, _ in results] == [1, 2]
+
+def test_filters_and_pagination():
+    index = LessonSearchIndex(LESSONS)
+    total, results = index.search(category="Basics", difficulty="beginner", offset=1, limit=1)
+    assert total == 2
+    assert [lesson["id"] for lesson, _ in results] == [2]
+    assert index.search("print", category="functions") == (0, [])
+
+def test_sync_is_incremental():
+    index = LessonSearchIndex(LESSONS)
+    renamed = dict(LESSONS[2], title="Closures", description="Capture variables", content="Inner functions.")
+    index.sync([LESSONS[0], renamed])
+    assert index.search("decorators") == (0, [])
+    assert index.search("closures")[1][0][0]["id"] == 3
+    assert index.search("loops") == (0, [])
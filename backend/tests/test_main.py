@@ -1,3 +1,5 @@
+import json
+import os
 import pytest
 from fastapi.testclient import TestClient
 from main import app
@@ -52,4 +54,468 @@ def test_register_duplicate_user():
     client.post("/register", json=user_data)
     # Try to register again
     response = client.post("/register", json=user_data)
-    assert response.status_code == 400 
\ No newline at end of file
+    assert response.status_code == 400 
+def test_execute_code():
+    response = client.post("/execute", json={"code": "print('Hello, World!')"})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["output"] == "Hello, World!"
+    assert result["error"] == ""
+    assert result["success"] is True
+    assert result["truncated"] is False
+    assert result["exit_reason"] == "ok"
+
+def test_execute_code_error():
+    response = client.post("/execute", json={"code": "1 / 0"})
+    result = response.json()
+    assert result["success"] is False
+    assert "ZeroDivisionError" in result["error"]
+    assert 'File "<string>", line 1' in result["error"]
+
+def test_execute_code_exit_status():
+    result = client.post("/execute", json={"code": "import sys\nprint('bye')\nsys.exit(3)"}).json()
+    assert result["success"] is False
+    result = client.post("/execute", json={"code": "if __name__ == '__main__':\n    print('main')"}).json()
+    assert result["output"] == "main"
+
+def test_execute_code_is_isolated():
+    client.post("/execute", json={"code": "import builtins\nbuiltins.leaked = True"})
+    result = client.post("/execute", json={"code": "print(hasattr(__builtins__, 'leaked'))"}).json()
+    assert result["output"] == "False"
+
+def test_execute_reports_queue_headers():
+    response = client.post("/execute", json={"code": "print(1)"})
+    assert response.headers["X-Queue-Depth"] == "0"
+    assert "X-Queue-Wait-Ms" in response.headers
+
+def test_execute_caches_deterministic_code():
+    code = "print(sum(range(10)))"
+    first = client.post("/execute", json={"code": code})
+    second = client.post("/execute", json={"code": code})
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert client.get("/execute/cache").status_code in (401, 403)
+    stats = client.get("/execute/cache", headers=auth_headers()).json()
+    assert stats["hits"] >= 1
+
+def test_execute_does_not_cache_random_code():
+    code = "import random\nprint(random.random())"
+    client.post("/execute", json={"code": code})
+    response = client.post("/execute", json={"code": code})
+    assert response.headers["X-Cache"] == "MISS"
+
+def test_execute_stream():
+    code = "import sys\nprint('one')\nprint('oops', file=sys.stderr)\nprint('two')"
+    with client.stream("POST", "/execute/stream", json={"code": code}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in body.strip().split("\n\n")
+    ]
+    stdout = "".join(data for name, data in events if name == "stdout")
+    stderr = "".join(data for name, data in events if name == "stderr")
+    assert stdout == "one\ntwo\n"
+    assert stderr == "oops\n"
+    name, status = events[-1]
+    assert name == "result"
+    assert status["success"] is True
+    assert status["returncode"] == 0
+    assert status["error"] == ""
+    assert status["exit_reason"] == "ok"
+
+def test_execute_stream_ends_when_the_worker_fails(monkeypatch):
+    import main
+
+    def broken_stream(code, virtual_clock=False):
+        yield "stdout", "partial\n"
+        raise KeyError("returncode")
+
+    monkeypatch.setattr(main, "stream_python_code", broken_stream)
+    with client.stream("POST", "/execute/stream", json={"code": "print('partial')"}) as response:
+        body = "".join(response.iter_text())
+    name, data = body.strip().split("\n\n")[-1].split("\n")
+    assert name == "event: result"
+    result = json.loads(data[len("data: "):])
+    assert result["success"] is False
+    assert result["exit_reason"] == "sandbox_error"
+
+def test_execute_batch():
+    batch = [
+        {"code": "print('first')"},
+        {"code": "raise ValueError('second')"},
+        {"code": "print(3 * 3)"},
+    ]
+    response = client.post("/execute/batch", json=batch)
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["output"] for item in results] == ["first", "", "9"]
+    assert [item["success"] for item in results] == [True, False, True]
+    assert "ValueError: second" in results[1]["error"]
+    assert all(item["duration_ms"] >= 0 for item in results)
+
+def test_execute_batch_larger_than_the_scheduler(monkeypatch):
+    import main
+    from execution import ExecutionScheduler
+    monkeypatch.setattr(main, "execution_scheduler", ExecutionScheduler(max_concurrency=1, max_queue=1))
+    batch = [{"code": f"print({n} * 2)"} for n in range(6)]
+    response = client.post("/execute/batch", json=batch)
+    assert response.status_code == 200
+    assert [item["output"] for item in response.json()["results"]] == [str(n * 2) for n in range(6)]
+
+def test_execute_batch_too_large():
+    response = client.post("/execute/batch", json=[{"code": "pass"}] * 1000)
+    assert response.status_code == 413
+
+def auth_headers(username="progressuser"):
+    client.post("/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": "testpassword",
+    })
+    token = client.post("/login", params={"username": username, "password": "testpassword"}).json()
+    return {"Authorization": f"Bearer {token['access_token']}"}
+
+def test_progress_is_scoped_to_user():
+    headers = auth_headers()
+    client.post("/progress", json={"user_id": 1, "lesson_id": 1, "completed": True}, headers=headers)
+    client.post("/progress", json={"user_id": 10, "lesson_id": 2, "completed": True}, headers=headers)
+    progress = client.get("/progress/1", headers=headers).json()
+    assert [(p["user_id"], p["lesson_id"]) for p in progress] == [(1, 1)]
+
+def test_progress_batch():
+    headers = auth_headers()
+    batch = [
+        {"user_id": 42, "lesson_id": lesson_id, "completed": True}
+        for lesson_id in (1, 2, 3)
+    ]
+    response = client.post("/progress/batch", json=batch, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["updated"] == 3
+    progress = client.get("/progress/42", headers=headers).json()
+    assert sorted(p["lesson_id"] for p in progress) == [1, 2, 3]
+    lesson_progress = client.get("/lessons/2/progress", headers=headers).json()
+    assert 42 in [p["user_id"] for p in lesson_progress]
+
+def test_progress_is_persisted():
+    from database import ProgressStore
+    headers = auth_headers()
+    client.post("/progress", json={"user_id": 7, "lesson_id": 5, "completed": True}, headers=headers)
+    # A fresh store (as another worker would have) sees the same record
+    assert ProgressStore().get(7, 5)["completed"] is True
+
+def test_migrations_upgrade_lesson_bodies_table(tmp_path, monkeypatch):
+    import database
+    from sqlalchemy import inspect, text
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        # The lessons table as create_all made it, bodies included, before
+        # there were migrations
+        connection.execute(text(
+            "CREATE TABLE lessons (id INTEGER PRIMARY KEY, title VARCHAR(255) NOT NULL, "
+            "description TEXT NOT NULL, content TEXT NOT NULL, code_example TEXT NOT NULL, "
+            "difficulty VARCHAR(50) NOT NULL, category VARCHAR(100) NOT NULL)"
+        ))
+        connection.execute(text("INSERT INTO lessons VALUES (1, 't', 'd', 'c', 'e', 'beginner', 'basics')"))
+    database.migrate(engine)
+    columns = {column["name"] for column in inspect(engine).get_columns("lessons")}
+    assert "content" not in columns and "code_example" not in columns
+    assert {"users", "progress", "progress_stats"} <= set(inspect(engine).get_table_names())
+    monkeypatch.setattr(database.SessionLocal, "kw", {**database.SessionLocal.kw, "bind": engine})
+    database.LessonStore().upsert_many([{"id": 2, "title": "t", "description": "d", "content": "c",
+                                         "code_example": "e", "difficulty": "beginner", "category": "basics"}])
+    assert [lesson["id"] for lesson in database.LessonStore().all()] == [1, 2]
+
+def test_migrations_match_the_models(tmp_path):
+    import database
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    database.migrate(engine)
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), database.Base.metadata) == []
+
+def test_progress_unknown_lesson():
+    headers = auth_headers()
+    response = client.post("/progress", json={"user_id": 7, "lesson_id": 999, "completed": True}, headers=headers)
+    assert response.status_code == 404
+
+def test_lessons_etag():
+    response = client.get("/lessons")
+    etag = response.headers["ETag"]
+    cached = client.get("/lessons", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    lesson = client.get("/lessons/1")
+    assert client.get("/lessons/1", headers={"If-None-Match": lesson.headers["ETag"]}).status_code == 304
+    assert client.get("/lessons/2", headers={"If-None-Match": lesson.headers["ETag"]}).status_code == 200
+
+def test_lessons_summary_pagination():
+    full = client.get("/lessons").json()
+    response = client.get("/lessons", params={"summary": True, "offset": 2, "limit": 3})
+    assert response.status_code == 200
+    assert int(response.headers["X-Total-Count"]) == len(full)
+    page = response.json()
+    assert [lesson["id"] for lesson in page] == [lesson["id"] for lesson in full[2:5]]
+    assert "content" not in page[0]
+    assert "code_example" not in page[0]
+
+def test_lessons_gzip():
+    response = client.get("/lessons", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    identity = client.get("/lessons", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in identity.headers
+    assert response.json() == identity.json()
+    assert response.headers["ETag"] != identity.headers["ETag"]
+
+def test_verified_tokens_are_cached():
+    headers = auth_headers("cacheduser")
+    assert client.get("/auth/cache").status_code in (401, 403)
+    before = client.get("/auth/cache", headers=headers).json()
+    client.get("/progress/1", headers=headers)
+    after = client.get("/auth/cache", headers=headers).json()
+    assert after["hits"] >= before["hits"] + 1
+
+def test_expired_token_is_rejected():
+    from datetime import timedelta
+    from main import create_access_token
+    token = create_access_token({"sub": "progressuser"}, expires_delta=timedelta(seconds=-1))
+    response = client.get("/progress/1", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+def test_token_cache_evicts_at_expiry():
+    from main import ResultCache, TokenData
+    cache = ResultCache(max_entries=1, ttl_seconds=1800, only_deterministic=False)
+    cache.put("a", TokenData(username="a"), -1)
+    assert cache.get("a") is None
+    cache.put("a", TokenData(username="a"), 60)
+    cache.put("b", TokenData(username="b"), 60)
+    assert cache.get("a") is None
+    assert cache.get("b").username == "b"
+
+def test_execute_output_is_capped():
+    from main import EXECUTION_MAX_OUTPUT_BYTES
+    result = client.post("/execute", json={"code": "for i in range(100000):\n    print('x' * 20)"}).json()
+    assert result["success"] is True
+    assert result["truncated"] is True
+    assert len(result["output"]) <= EXECUTION_MAX_OUTPUT_BYTES
+
+def test_execute_reports_resource_usage():
+    result = client.post("/execute", json={"code": "data = list(range(100000))\nprint(len(data))"}).json()
+    assert result["output"] == "100000"
+    assert result["wall_time_ms"] > 0
+    assert result["cpu_time_ms"] >= 0
+    assert result["peak_rss_kb"] > 0
+
+def test_execute_memory_limit():
+    result = client.post("/execute", json={"code": "data = bytearray(4 * 1024 ** 3)"}).json()
+    assert result["success"] is False
+    assert result["exit_reason"] == "memory_limit"
+    assert "MemoryError" in result["error"]
+
+def test_metrics():
+    client.get("/lessons/1")
+    client.post("/execute", json={"code": "print('metrics')"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    worker = f'worker="{os.getpid()}"'
+    assert f'http_requests_total{{{worker},method="GET",route="/lessons/{{lesson_id}}",status="200"}}' in body
+    assert (f'http_request_duration_seconds_bucket{{{worker},method="GET",route="/lessons/{{lesson_id}}",'
+            f'le="+Inf"}}') in body
+    assert f"execution_run_seconds_count{{{worker}}}" in body
+    assert f'execution_results_total{{{worker},exit_reason="ok"}}' in body
+    assert f"execution_queue_depth{{{worker}}} 0" in body
+
+def test_execute_preflight_rejects_syntax_errors():
+    response = client.post("/execute", json={"code": "for i in range(3)\n    print(i)"})
+    assert response.headers["X-Preflight"] == "rejected"
+    result = response.json()
+    assert result["success"] is False
+    assert result["error"].endswith("SyntaxError: expected ':'")
+    # Same text the sandbox itself would have produced
+    from main import execute_python_code
+    assert execute_python_code("for i in range(3)\n    print(i)").error == result["error"]
+
+def test_search_lessons():
+    response = client.get("/lessons/search", params={"q": "decorator functions", "limit": 3})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] >= 1
+    assert body["results"][0]["title"] == "Decorators"
+    assert "content" not in body["results"][0]
+
+    filtered = client.get("/lessons/search", params={"difficulty": "beginner"}).json()
+    assert filtered["total"] > 0
+    assert all(lesson["difficulty"] == "beginner" for lesson in filtered["results"])
+
+def test_lessons_hot_reload(tmp_path, monkeypatch):
+    import os
+    import shutil
+    import main
+    from lesson_library import LessonLibrary
+    lessons_dir = tmp_path / "lessons"
+    shutil.copytree(main.LESSONS_DIR, lessons_dir)
+    monkeypatch.setattr(main, "lesson_library", LessonLibrary(str(lessons_dir)))
+    monkeypatch.setattr(main, "lesson_catalog", None)
+
+    before = client.get("/lessons/1")
+    assert before.json()["title"] == "Hello World"
+    assert main.reload_lessons() is False
+
+    catalog_path = lessons_dir / "catalog.json"
+    catalog = json.loads(catalog_path.read_text())
+    catalog["lessons"][0]["title"] = "Hello, World"
+    catalog_path.write_text(json.dumps(catalog))
+    stat = os.stat(catalog_path)
+    os.utime(catalog_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert main.reload_lessons() is True
+
+    after = client.get("/lessons/1", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.json()["title"] == "Hello, World"
+    assert after.json()["code_example"] == before.json()["code_example"]
+
+def test_submit_lesson():
+    from main import get_lesson_catalog
+    example = get_lesson_catalog().lessons[8]["code_example"]
+    response = client.post("/lessons/8/submit", json={"code": example})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["passed"] is True
+    assert body["passed_count"] == body["total"] == 3
+    assert body["first_failure"] is None
+
+    wrong = example.replace("return a + b", "return a - b")
+    body = client.post("/lessons/8/submit", json={"code": wrong}).json()
+    assert body["passed"] is False
+    assert body["passed_count"] == 2
+    assert body["first_failure"]["name"] == "add_numbers"
+    assert body["first_failure"]["diff"].endswith("--5\n+9")
+
+def test_submit_lesson_cannot_forge_its_grade():
+    # Fake passing reports for every case, built from what the grader's frames hold
+    forged = (
+        "import json, os, sys\n"
+        "frame = sys._getframe()\n"
+        "while frame:\n"
+        "    names = frame.f_locals\n"
+        "    for fd in range(3, 64):\n"
+        "        for index, case in enumerate(names.get('cases') or []):\n"
+        "            line = json.dumps({'case': index, 'duration_ms': 1, 'passed': True,\n"
+        "                               'actual': case.get('expected')})\n"
+        "            try:\n"
+        "                os.write(fd, (str(names.get('marker', '')) + line + '\\n').encode())\n"
+        "            except OSError:\n"
+        "                pass\n"
+        "    frame = frame.f_back\n"
+        "os._exit(0)\n"
+    )
+    body = client.post("/lessons/8/submit", json={"code": forged}).json()
+    assert body["passed_count"] == 0
+
+    always_equal = (
+        "class Anything:\n"
+        "    def __eq__(self, other):\n"
+        "        return True\n"
+        "def greet(name):\n    return Anything()\n"
+        "def add_numbers(a, b):\n    return Anything()\n"
+        "def calculate_area(width, height):\n    return Anything()\n"
+    )
+    body = client.post("/lessons/8/submit", json={"code": always_equal}).json()
+    assert body["passed_count"] == 0
+
+def test_submit_lesson_errors():
+    assert client.post("/lessons/999/submit", json={"code": ""}).status_code == 404
+    assert client.post("/lessons/2/submit", json={"code": ""}).status_code == 400
+    body = client.post("/lessons/8/submit", json={"code": "def greet(name) return name"}).json()
+    assert body["exit_reason"] == "error"
+    assert all(result["error"].endswith("SyntaxError: expected ':'") for result in body["results"])
+
+def test_execute_virtual_clock():
+    code = "import time\nstarted = time.time()\ntime.sleep(60)\nprint(round(time.time() - started))"
+    response = client.post("/execute", json={"code": code, "virtual_clock": True})
+    result = response.json()
+    assert result["success"] is True
+    assert result["output"] == "60"
+    assert result["wall_time_ms"] < 5000
+
+def test_progress_stats():
+    from main import progress_db
+    headers = auth_headers()
+
+    def lesson_stats(lesson_id):
+        stats = client.get("/stats", headers=headers).json()
+        return next(lesson for lesson in stats["lessons"] if lesson["lesson_id"] == lesson_id), stats
+
+    before, stats_before = lesson_stats(4)
+    record = {"user_id": 500, "lesson_id": 4, "completed": True}
+    for _ in range(3):
+        # Re-submitting the same record must not count twice
+        assert client.post("/progress", json=record, headers=headers).status_code == 200
+    after, stats = lesson_stats(4)
+    assert after["started"] == before["started"] + 1
+    assert after["completed"] == before["completed"] + 1
+    assert stats["recent_completions"][-1]["completions"] == stats_before["recent_completions"][-1]["completions"] + 1
+    assert stats["categories"]["basics"]["completed"] == stats_before["categories"]["basics"]["completed"] + 1
+
+    client.post("/progress", json={**record, "completed": False}, headers=headers)
+    client.post("/progress/batch", json=[
+        {"user_id": 500, "lesson_id": 5, "completed": False},
+        {"user_id": 500, "lesson_id": 5, "completed": True},
+    ], headers=headers)
+    assert lesson_stats(4)[0]["completed"] == before["completed"]
+    user = client.get("/stats/users/500", headers=headers).json()
+    assert (user["started"], user["completed"], user["completion_rate"]) == (2, 1, 0.5)
+    assert user["catalog_completion_rate"] > 0
+
+    # Un-completing takes a completion back out of its hour
+    recent = client.get("/stats", headers=headers).json()["recent_completions"][-1]["completions"]
+    for completed in (True, False, True, False, True):
+        client.post("/progress", json={"user_id": 501, "lesson_id": 4, "completed": completed}, headers=headers)
+    stats = client.get("/stats", headers=headers).json()
+    assert stats["recent_completions"][-1]["completions"] == recent + 1
+
+    # Incremental counters agree with a full recount
+    scopes = ["all", "lesson", "user", "category", "difficulty", "hour"]
+    counters = progress_db.stats(scopes)
+    progress_db.rebuild_stats()
+    assert progress_db.stats(scopes) == counters
+
+    # Workers rebuilding at the same time don't add up each other's counts
+    import threading
+    rebuilds = [threading.Thread(target=progress_db.rebuild_stats) for _ in range(4)]
+    for rebuild in rebuilds:
+        rebuild.start()
+    for rebuild in rebuilds:
+        rebuild.join()
+    assert progress_db.stats(scopes) == counters
+
+def test_progress_batch_too_large():
+    import main
+    batch = [{"user_id": 601, "lesson_id": 1, "completed": True}] * (main.PROGRESS_BATCH_MAX_SIZE + 1)
+    response = client.post("/progress/batch", json=batch, headers=auth_headers())
+    assert response.status_code == 413
+
+def test_progress_batch_writes_in_bulk():
+    from sqlalchemy import event
+    from database import engine
+    headers = auth_headers()
+    batch = [{"user_id": 600, "lesson_id": lesson_id, "completed": lesson_id % 2 == 0} for lesson_id in range(1, 21)]
+    client.post("/progress/batch", json=batch[:10], headers=headers)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        # Half of these exist already, half are new
+        response = client.post("/progress/batch", json=batch[5:], headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 200
+    writes = [statement for statement in statements if not statement.lstrip().upper().startswith("SELECT")]
+    assert len(writes) == 3
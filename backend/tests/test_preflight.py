@@ -0,0 +1,17 @@
+from preflight import check_code
+
+def test_valid_code_passes():
+    assert check_code("print('Hello')") is None
+
+def test_syntax_error_is_formatted_like_cpython():
+    error = check_code("print(")
+    assert error.startswith('File "<string>", line 1')
+    assert error.endswith("SyntaxError: '(' was never closed")
+
+def test_compile_stage_errors_are_caught():
+    assert check_code("return 5").endswith("SyntaxError: 'return' outside function")
+
+def test_forbidden_modules():
+    assert check_code("import socket", forbidden_modules={"ctypes"}) is None
+    error = check_code("x = 1\nfrom ctypes import util", forbidden_modules={"ctypes"})
+    assert error == "File \"<string>\", line 2\nImportError: import of 'ctypes' is not allowed here"
@@ -0,0 +1,37 @@
+import time
+
+from result_cache import ResultCache, is_deterministic
+
+def test_is_deterministic():
+    assert is_deterministic("print(2 + 3)")
+    assert is_deterministic("print(")
+    assert not is_deterministic("import random\nprint(random.randint(1, 6))")
+    assert not is_deterministic("from datetime import datetime\nprint(datetime.now())")
+    assert not is_deterministic("name = input()")
+
+def test_cache_lru_eviction():
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_ttl_and_namespace():
+    cache = ResultCache(max_entries=10, ttl_seconds=0.05, namespace="3.11")
+    cache.put("print(1)", "1")
+    assert cache.get("print(1)") == "1"
+    time.sleep(0.1)
+    assert cache.get("print(1)") is None
+    assert cache.key("x") != ResultCache(10, 60, namespace="3.12").key("x")
+
+def test_cache_per_entry_ttl():
+    cache = ResultCache(max_entries=10, ttl_seconds=60, only_deterministic=False)
+    assert cache.put("token", "alice", ttl_seconds=0.05)
+    assert not cache.put("expired", "bob", ttl_seconds=-1)
+    assert cache.get("token") == "alice"
+    time.sleep(0.1)
+    assert cache.get("token") is None
+    assert cache.get("expired") is None